@@ -16,6 +16,7 @@ ANALYSIS_DIR = DATA_DIR / "analysis"
 # Model configurations
 EMBEDDING_MODEL = "all-MiniLM-L6-v2"  # Sentence transformer model
 EMBEDDING_BATCH_SIZE = 100
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")  # "torch" or "onnx-int8"
 MAX_SEQUENCE_LENGTH = 512
 
 # ChromaDB settings
@@ -26,6 +27,13 @@ CHROMA_COLLECTION_NAMES = {
     "friendships": "friendships"
 }
 
+# HNSW index parameters for small collections (applied when a collection is created)
+HNSW_PARAMS = {
+    "hnsw:M": 8,
+    "hnsw:construction_ef": 64,
+    "hnsw:search_ef": 16
+}
+
 # Analysis parameters
 RESPONSE_TIME_THRESHOLDS = {
     "fast": 300,      # 5 minutes
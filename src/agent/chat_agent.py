@@ -12,7 +12,7 @@ sys.path.append(str(Path(__file__).parent.parent))
 from rag.embeddings import RAGChatAnalyzer
 import json
 import logging
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
 import re
 import asyncio
@@ -268,15 +268,16 @@ class ConversationalAgent:
     """Main conversational agent for friendship analysis."""
     
     def __init__(self, db_path: str = "./data/embeddings/chroma_db", 
-                 llm_provider: str = "local"):
+                 llm_provider: str = "local", backend: str = "torch"):
         """
         Initialize the conversational agent.
         
         Args:
             db_path: Path to ChromaDB vector database
             llm_provider: LLM provider ('openai', 'ollama', 'local')
+            backend: Embedding backend ('torch', 'onnx-int8')
         """
-        self.rag_analyzer = RAGChatAnalyzer(db_path)
+        self.rag_analyzer = RAGChatAnalyzer(db_path, backend=backend)
         self.query_classifier = QueryClassifier()
         self.insight_generator = FriendshipInsightGenerator(self.rag_analyzer)
         self.llm_provider = llm_provider
@@ -317,15 +318,79 @@ class ConversationalAgent:
         Returns:
             QueryResponse object with answer and metadata
         """
-        logger.info(f"Processing query: {user_query}")
+        return self.process_queries([user_query])[0]
+    
+    def process_queries(self, user_queries: List[str]) -> List[QueryResponse]:
+        """
+        Process several user queries, retrieving context for all of them at once.
+        
+        Args:
+            user_queries: User's natural language questions
+            
+        Returns:
+            One QueryResponse per query, in query order
+        """
+        if not user_queries:
+            return []
         
-        # Step 1: Classify the query
-        classification = self.query_classifier.classify_query(user_query)
-        logger.info(f"Query classified as: {classification['primary_category']}")
+        classifications, relevant_data = self._classify_and_retrieve(user_queries)
         
-        # Step 2: Retrieve relevant data using RAG
-        relevant_data = self.rag_analyzer.query_insights(user_query, context_limit=8)
+        responses = [
+            self._build_response(user_query, classification, data)
+            for user_query, classification, data in zip(user_queries, classifications, relevant_data)
+        ]
         
+        self._record_responses(user_queries, responses)
+        return responses
+    
+    async def process_queries_async(self, user_queries: List[str]) -> List[QueryResponse]:
+        """
+        Async variant of process_queries that generates the answers concurrently.
+        
+        Retrieval is still one batched lookup; answer generation, which may
+        wait on an LLM round trip, runs in worker threads so the queries
+        overlap instead of waiting on each other.
+        
+        Args:
+            user_queries: User's natural language questions
+            
+        Returns:
+            One QueryResponse per query, in query order
+        """
+        if not user_queries:
+            return []
+        
+        classifications, relevant_data = await asyncio.to_thread(self._classify_and_retrieve, user_queries)
+        
+        responses = await asyncio.gather(*(
+            asyncio.to_thread(self._build_response, user_query, classification, data)
+            for user_query, classification, data in zip(user_queries, classifications, relevant_data)
+        ))
+        
+        self._record_responses(user_queries, responses)
+        return list(responses)
+    
+    def _classify_and_retrieve(self, user_queries: List[str]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Classify each query and fetch RAG context for all of them at once."""
+        if not user_queries:
+            return [], []
+        
+        # Step 1: Classify the queries
+        classifications = []
+        for user_query in user_queries:
+            logger.info(f"Processing query: {user_query}")
+            classification = self.query_classifier.classify_query(user_query)
+            logger.info(f"Query classified as: {classification['primary_category']}")
+            classifications.append(classification)
+        
+        # Step 2: Retrieve relevant data using RAG in one batched lookup
+        relevant_data = self.rag_analyzer.query_insights_batch(user_queries, context_limit=8)
+        
+        return classifications, relevant_data
+    
+    def _build_response(self, user_query: str, classification: Dict[str, Any],
+                        relevant_data: Dict[str, Any]) -> QueryResponse:
+        """Turn a classified query and its retrieved data into a response."""
         # Step 3: Generate insights
         insights = self.insight_generator.generate_insights(classification, relevant_data)
         
@@ -347,15 +412,18 @@ class ConversationalAgent:
             timestamp=datetime.now().isoformat()
         )
         
-        # Step 6: Add to conversation history
-        self.conversation_history.append({
-            'query': user_query,
-            'response': response,
-            'timestamp': response.timestamp
-        })
-        
         return response
     
+    def _record_responses(self, user_queries: List[str], responses: List[QueryResponse]):
+        """Add answered queries to the conversation history in query order."""
+        # Step 6: Add to conversation history
+        for user_query, response in zip(user_queries, responses):
+            self.conversation_history.append({
+                'query': user_query,
+                'response': response,
+                'timestamp': response.timestamp
+            })
+    
     def _generate_llm_response(self, query: str, data: Dict[str, Any], 
                               insights: List[str], classification: Dict[str, Any]) -> str:
         """Generate response using external LLM."""
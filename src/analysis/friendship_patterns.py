@@ -39,44 +39,52 @@ class CommunicationPatternAnalyzer:
         Returns:
             Dictionary containing response pattern analysis
         """
-        response_data = defaultdict(list)
-        conversation_starters = defaultdict(int)
-        
         # Filter out system messages
         regular_messages = [msg for msg in messages if not msg.get('is_system', False)]
         
         if len(regular_messages) < 2:
             return {}
         
-        # Analyze response times and conversation initiation
-        for i in range(1, len(regular_messages)):
-            current_msg = regular_messages[i]
-            previous_msg = regular_messages[i-1]
-            
-            # Response time analysis
-            if current_msg.get('response_time_seconds') is not None:
-                response_time = current_msg['response_time_seconds']
-                
-                # Only consider responses between different people
-                if current_msg['sender'] != previous_msg['sender']:
-                    key = f"{previous_msg['sender']} -> {current_msg['sender']}"
-                    response_data[key].append(response_time)
-            
-            # Conversation starter analysis (messages after long gaps)
-            if current_msg.get('response_time_seconds', 0) > 3600:  # 1 hour gap
-                conversation_starters[current_msg['sender']] += 1
+        # Column views of the conversation; a missing response time becomes NaN
+        senders = [msg['sender'] for msg in regular_messages]
+        times = np.array([
+            np.nan if msg.get('response_time_seconds') is None else msg['response_time_seconds']
+            for msg in regular_messages
+        ], dtype=float)
+        previous_senders, current_senders, current_times = senders[:-1], senders[1:], times[1:]
+        
+        # Only consider responses between different people
+        is_reply = np.fromiter(
+            (prev != cur for prev, cur in zip(previous_senders, current_senders)),
+            dtype=bool, count=len(current_senders)
+        ) & ~np.isnan(current_times)
+        
+        # Conversation starter analysis (messages after a 1 hour gap)
+        is_starter = current_times > 3600
+        conversation_starters = Counter(
+            sender for sender, starter in zip(current_senders, is_starter) if starter
+        )
+        
+        # Group reply times by direction, keeping first-seen order and message order
+        keys = [
+            f"{prev} -> {cur}"
+            for prev, cur, reply in zip(previous_senders, current_senders, is_reply) if reply
+        ]
+        reply_times = current_times[is_reply]
+        codes, directions = pd.factorize(pd.Series(keys, dtype=object))
+        order = np.argsort(codes, kind='stable')
+        boundaries = np.cumsum(np.bincount(codes, minlength=len(directions)))[:-1]
         
         # Calculate response statistics
         response_stats = {}
-        for key, times in response_data.items():
-            if times:
-                response_stats[key] = {
-                    'median_response_time': np.median(times),
-                    'mean_response_time': np.mean(times),
-                    'fast_responses': sum(1 for t in times if t < 300),  # < 5 minutes
-                    'slow_responses': sum(1 for t in times if t > 3600),  # > 1 hour
-                    'total_responses': len(times)
-                }
+        for key, group in zip(directions, np.split(reply_times[order], boundaries)):
+            response_stats[key] = {
+                'median_response_time': np.median(group),
+                'mean_response_time': np.mean(group),
+                'fast_responses': int(np.count_nonzero(group < 300)),  # < 5 minutes
+                'slow_responses': int(np.count_nonzero(group > 3600)),  # > 1 hour
+                'total_responses': len(group)
+            }
         
         return {
             'response_statistics': response_stats,
@@ -192,29 +200,36 @@ class SentimentAnalyzer:
             if msg.get('is_system', False) or not msg.get('message', '').strip():
                 continue
             
-            sender = msg['sender']
-            text = msg['message']
-            
-            # TextBlob sentiment analysis
-            blob = TextBlob(text)
-            polarity = blob.sentiment.polarity  # -1 to 1
-            subjectivity = blob.sentiment.subjectivity  # 0 to 1
-            
-            # Emoji sentiment analysis
-            emoji_sentiment = self._analyze_emoji_sentiment(msg.get('emojis', []))
-            
-            # Combined sentiment (weighted average)
-            combined_sentiment = (polarity * 0.7) + (emoji_sentiment * 0.3)
-            
-            sentiment_data[sender].append({
-                'timestamp': msg['timestamp'],
-                'text_sentiment': polarity,
-                'emoji_sentiment': emoji_sentiment,
-                'combined_sentiment': combined_sentiment,
-                'subjectivity': subjectivity,
-                'message_length': msg.get('message_length', 0)
-            })
+            sentiment_data[msg['sender']].append(self.score_message(msg))
+        
+        return self.summarize_sentiment(sentiment_data)
+    
+    def score_message(self, msg: Dict[str, Any]) -> Dict[str, Any]:
+        """Score the sentiment of a single non-empty, non-system message."""
+        text = msg['message']
         
+        # TextBlob sentiment analysis
+        blob = TextBlob(text)
+        polarity = blob.sentiment.polarity  # -1 to 1
+        subjectivity = blob.sentiment.subjectivity  # 0 to 1
+        
+        # Emoji sentiment analysis
+        emoji_sentiment = self._analyze_emoji_sentiment(msg.get('emojis', []))
+        
+        # Combined sentiment (weighted average)
+        combined_sentiment = (polarity * 0.7) + (emoji_sentiment * 0.3)
+        
+        return {
+            'timestamp': msg['timestamp'],
+            'text_sentiment': polarity,
+            'emoji_sentiment': emoji_sentiment,
+            'combined_sentiment': combined_sentiment,
+            'subjectivity': subjectivity,
+            'message_length': msg.get('message_length', 0)
+        }
+    
+    def summarize_sentiment(self, sentiment_data: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Any]:
+        """Aggregate per-message sentiment scores into per-participant statistics."""
         # Calculate sentiment statistics
         sentiment_stats = {}
         for sender, sentiments in sentiment_data.items():
@@ -310,7 +325,8 @@ class FriendshipStrengthAnalyzer:
     
     def calculate_friendship_strength(self, chat_data: Dict[str, Any], 
                                     communication_patterns: Dict[str, Any],
-                                    sentiment_analysis: Dict[str, Any]) -> Dict[str, Any]:
+                                    sentiment_analysis: Dict[str, Any],
+                                    depth_score: Optional[float] = None) -> Dict[str, Any]:
         """
         Calculate friendship strength metrics.
         
@@ -318,6 +334,8 @@ class FriendshipStrengthAnalyzer:
             chat_data: Processed chat data
             communication_patterns: Communication pattern analysis
             sentiment_analysis: Sentiment analysis results
+            depth_score: Conversation depth score if already computed, otherwise
+                it is derived from the chat's messages
             
         Returns:
             Dictionary containing friendship strength metrics
@@ -336,7 +354,8 @@ class FriendshipStrengthAnalyzer:
         response_score = self._calculate_response_score(communication_patterns)
         initiation_score = self._calculate_initiation_score(communication_patterns)
         sentiment_score = self._calculate_sentiment_score(sentiment_analysis)
-        depth_score = self._calculate_conversation_depth_score(messages)
+        if depth_score is None:
+            depth_score = self._calculate_conversation_depth_score(messages)
         
         # Weighted overall score
         overall_score = (
@@ -447,6 +466,11 @@ class FriendshipStrengthAnalyzer:
         # Average words per message
         avg_words = np.mean([msg.get('word_count', 0) for msg in regular_messages])
         
+        return self.depth_score(avg_length, avg_words)
+    
+    @staticmethod
+    def depth_score(avg_length: float, avg_words: float) -> float:
+        """Combine average message length and word count into a 0-1 depth score."""
         # Normalize scores
         length_score = min(avg_length / 100, 1.0)  # 100 chars is good
         word_score = min(avg_words / 15, 1.0)  # 15 words is good
@@ -504,6 +528,63 @@ class FriendshipStrengthAnalyzer:
         }
 
 
+def analyze_sentiment_and_strength(chat_data: Dict[str, Any],
+                                   communication_patterns: Dict[str, Any],
+                                   sentiment_analyzer: Optional[SentimentAnalyzer] = None,
+                                   friendship_analyzer: Optional[FriendshipStrengthAnalyzer] = None
+                                   ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Run sentiment analysis and friendship strength in a single pass over the messages.
+    
+    Equivalent to calling SentimentAnalyzer.analyze_message_sentiment and then
+    FriendshipStrengthAnalyzer.calculate_friendship_strength, except that the
+    conversation depth totals are gathered while scoring sentiment instead of
+    walking the messages again.
+    
+    Args:
+        chat_data: Processed chat data
+        communication_patterns: Communication pattern analysis
+        sentiment_analyzer: Analyzer to reuse, a new one is created if omitted
+        friendship_analyzer: Analyzer to reuse, a new one is created if omitted
+        
+    Returns:
+        Tuple of (sentiment analysis results, friendship strength metrics)
+    """
+    sentiment_analyzer = sentiment_analyzer or SentimentAnalyzer()
+    friendship_analyzer = friendship_analyzer or FriendshipStrengthAnalyzer()
+    
+    sentiment_data = defaultdict(list)
+    regular_count = 0
+    total_length = 0
+    total_words = 0
+    
+    for msg in chat_data.get('messages', []):
+        if msg.get('is_system', False):
+            continue
+        
+        # Depth covers every regular message, sentiment only non-empty ones
+        regular_count += 1
+        total_length += msg.get('message_length', 0)
+        total_words += msg.get('word_count', 0)
+        
+        if msg.get('message', '').strip():
+            sentiment_data[msg['sender']].append(sentiment_analyzer.score_message(msg))
+    
+    sentiment_results = sentiment_analyzer.summarize_sentiment(sentiment_data)
+    
+    depth_score = 0.0
+    if regular_count:
+        # np.float64 keeps the result type identical to the np.mean-based path
+        depth_score = friendship_analyzer.depth_score(np.float64(total_length) / regular_count,
+                                                       np.float64(total_words) / regular_count)
+    
+    friendship_strength = friendship_analyzer.calculate_friendship_strength(
+        chat_data, communication_patterns, sentiment_results, depth_score=depth_score
+    )
+    
+    return sentiment_results, friendship_strength
+
+
 class PatternAnalysisOrchestrator:
     """Orchestrate all pattern analysis components."""
     
@@ -536,17 +617,15 @@ class PatternAnalysisOrchestrator:
             comm_patterns = self.comm_analyzer.analyze_response_patterns(messages, participants)
             freq_patterns = self.comm_analyzer.analyze_message_frequency(messages)
             
-            # Sentiment analysis
-            sentiment_results = self.sentiment_analyzer.analyze_message_sentiment(messages)
+            # Sentiment analysis and friendship strength in one pass over the messages
+            sentiment_results, friendship_strength = analyze_sentiment_and_strength(
+                chat_data, {**comm_patterns, **freq_patterns},
+                self.sentiment_analyzer, self.friendship_analyzer
+            )
             sentiment_trends = self.sentiment_analyzer.analyze_sentiment_trends(
                 sentiment_results.get('detailed_sentiments', {})
             )
             
-            # Friendship strength
-            friendship_strength = self.friendship_analyzer.calculate_friendship_strength(
-                chat_data, {**comm_patterns, **freq_patterns}, sentiment_results
-            )
-            
             return {
                 'chat_name': chat_data.get('chat_name'),
                 'participants': participants,
@@ -8,9 +8,10 @@ Supports multiple export formats and languages.
 """
 
 import re
+import mmap
 import pandas as pd
 from datetime import datetime
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, Iterable, Iterator
 import os
 import logging
 from pathlib import Path
@@ -97,6 +98,66 @@ class WhatsAppParser:
             logger.error(f"Error parsing {file_path}: {str(e)}")
             return {}
     
+    def parse_chat_file_iter(self, file_path: str, offset: int = 0,
+                             length: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Lazily parse a WhatsApp chat export, yielding enriched messages in order.
+        
+        The file is memory-mapped and read line by line, so callers that only
+        need the first few messages (e.g. with itertools.islice) never load or
+        parse the rest of the export. Lines that are not valid UTF-8 are decoded
+        as latin-1, mirroring the fallback used by parse_file.
+        
+        A byte window can be given to sample part of a large export: parsing
+        starts at the first line beginning at or after `offset` and stops after
+        the last line beginning within `length` bytes of it. Message IDs and
+        response times are then relative to the window.
+        
+        Args:
+            file_path: Path to the WhatsApp chat export file
+            offset: Byte offset to start reading from
+            length: Maximum number of bytes to read, or None for the rest of the file
+            
+        Yields:
+            Message dictionaries with the same fields as parse_file's messages
+        """
+        with open(file_path, 'rb') as f:
+            # mmap cannot map an empty file
+            if os.fstat(f.fileno()).st_size == 0:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                start = 0
+                if offset > 0:
+                    # Skip the partial line the offset lands in
+                    newline = mm.find(b'\n', offset - 1)
+                    start = newline + 1 if newline != -1 else len(mm)
+                end = len(mm) if length is None else min(len(mm), offset + length)
+                
+                mm.seek(start)
+                lines = (self._decode_line(raw) for raw in self._iter_mapped_lines(mm, end))
+                prev_msg = None
+                for i, msg in enumerate(self._iter_raw_messages(lines)):
+                    self._enrich_message(msg, i, prev_msg)
+                    yield msg
+                    prev_msg = msg
+    
+    @staticmethod
+    def _iter_mapped_lines(mm: mmap.mmap, end: int) -> Iterator[bytes]:
+        """Yield raw lines from the current position until one starts at or past `end`."""
+        while mm.tell() < end:
+            raw = mm.readline()
+            if not raw:
+                break
+            yield raw
+    
+    @staticmethod
+    def _decode_line(raw: bytes) -> str:
+        """Decode one line of an export, falling back to latin-1."""
+        try:
+            return raw.decode('utf-8')
+        except UnicodeDecodeError:
+            return raw.decode('latin-1')
+    
     def _read_file_with_encoding(self, file_path: str) -> str:
         """Try to read file with different encodings."""
         encodings = ['utf-8', 'utf-8-sig', 'latin-1', 'cp1252']
@@ -112,8 +173,11 @@ class WhatsAppParser:
     
     def _extract_messages(self, content: str) -> List[Dict[str, Any]]:
         """Extract messages from chat content."""
-        lines = content.split('\n')
-        messages = []
+        messages = list(self._iter_raw_messages(content.split('\n')))
+        return self._process_messages(messages)
+    
+    def _iter_raw_messages(self, lines: Iterable[str]) -> Iterator[Dict[str, Any]]:
+        """Group raw lines into messages, yielding each once it is complete."""
         current_message = None
         
         for line in lines:
@@ -125,9 +189,9 @@ class WhatsAppParser:
             message_data = self._parse_message_line(line)
             
             if message_data:
-                # Save previous message if exists
+                # Emit previous message if exists
                 if current_message:
-                    messages.append(current_message)
+                    yield current_message
                 
                 current_message = message_data
             else:
@@ -137,9 +201,7 @@ class WhatsAppParser:
         
         # Don't forget the last message
         if current_message:
-            messages.append(current_message)
-            
-        return self._process_messages(messages)
+            yield current_message
     
     def _parse_message_line(self, line: str) -> Optional[Dict[str, Any]]:
         """Parse a single message line."""
@@ -162,6 +224,12 @@ class WhatsAppParser:
             'Missed video call'
         ]
         
+        # Every pattern starts with a date or "[", so continuation lines can
+        # be rejected without running any of the regexes
+        first = line[0]
+        if first != '[' and not first.isdigit():
+            return None
+        
         # Try each pattern
         for pattern_name, pattern in self.patterns.items():
             match = pattern.match(line)
@@ -242,37 +310,40 @@ class WhatsAppParser:
         processed_messages = []
         
         for i, msg in enumerate(messages):
-            # Add message ID
-            msg['message_id'] = i
-            
-            # Detect media messages
-            msg['is_media'] = any(pattern in msg['message'] for pattern in self.media_patterns)
-            
-            # Extract emojis
-            msg['emojis'] = self._extract_emojis(msg['message'])
-            msg['emoji_count'] = len(msg['emojis'])
-            
-            # Message length and word count
-            msg['message_length'] = len(msg['message'])
-            msg['word_count'] = len(msg['message'].split()) if msg['message'] else 0
-            
-            # Time of day analysis
-            msg['hour'] = msg['timestamp'].hour
-            msg['day_of_week'] = msg['timestamp'].weekday()
-            msg['date'] = msg['timestamp'].date()
-            
-            # Response time (if not first message)
-            if i > 0:
-                prev_msg = messages[i-1]
-                time_diff = msg['timestamp'] - prev_msg['timestamp']
-                msg['response_time_seconds'] = time_diff.total_seconds()
-            else:
-                msg['response_time_seconds'] = None
-            
+            self._enrich_message(msg, i, messages[i-1] if i > 0 else None)
             processed_messages.append(msg)
             
         return processed_messages
     
+    def _enrich_message(self, msg: Dict[str, Any], index: int,
+                        prev_msg: Optional[Dict[str, Any]]) -> None:
+        """Add derived metadata to a single message in place."""
+        # Add message ID
+        msg['message_id'] = index
+        
+        # Detect media messages
+        msg['is_media'] = any(pattern in msg['message'] for pattern in self.media_patterns)
+        
+        # Extract emojis
+        msg['emojis'] = self._extract_emojis(msg['message'])
+        msg['emoji_count'] = len(msg['emojis'])
+        
+        # Message length and word count
+        msg['message_length'] = len(msg['message'])
+        msg['word_count'] = len(msg['message'].split()) if msg['message'] else 0
+        
+        # Time of day analysis
+        msg['hour'] = msg['timestamp'].hour
+        msg['day_of_week'] = msg['timestamp'].weekday()
+        msg['date'] = msg['timestamp'].date()
+        
+        # Response time (if not first message)
+        if prev_msg is not None:
+            time_diff = msg['timestamp'] - prev_msg['timestamp']
+            msg['response_time_seconds'] = time_diff.total_seconds()
+        else:
+            msg['response_time_seconds'] = None
+    
     def _extract_emojis(self, text: str) -> List[str]:
         """Extract emojis from text."""
         return [char for char in text if char in emoji.EMOJI_DATA]
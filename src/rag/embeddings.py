@@ -12,6 +12,8 @@ import pandas as pd
 import numpy as np
 from sentence_transformers import SentenceTransformer
 from typing import List, Dict, Any, Optional, Tuple
+from functools import lru_cache
+from collections import OrderedDict
 import json
 import logging
 from pathlib import Path
@@ -22,21 +24,108 @@ import os
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Quantized ONNX Runtime weights shipped with sentence-transformers models, per backend
+_ONNX_BACKEND_FILES = {
+    'onnx-int8': 'onnx/model_qint8_avx512_vnni.onnx'
+}
+
+
+@lru_cache(maxsize=None)
+def _load_sentence_transformer(model_name: str, backend: str) -> SentenceTransformer:
+    """
+    Load an encoder for the requested backend, falling back to torch.
+    
+    Cached per (model_name, backend) so every ChatEmbeddingGenerator in the
+    process, including the ones created by RAGChatAnalyzer and the agent,
+    shares a single loaded model instead of reading the weights again.
+    """
+    if backend in _ONNX_BACKEND_FILES:
+        try:
+            return SentenceTransformer(
+                model_name,
+                backend='onnx',
+                model_kwargs={'file_name': _ONNX_BACKEND_FILES[backend]}
+            )
+        except Exception as e:
+            # Needs sentence-transformers>=3.2 with optimum[onnxruntime] installed
+            logger.warning(f"Could not load {backend} embedding backend, using torch: {e}")
+    elif backend != 'torch':
+        logger.warning(f"Unknown embedding backend '{backend}', using torch")
+    
+    return SentenceTransformer(model_name)
+
 
 class ChatEmbeddingGenerator:
     """Generate embeddings for chat messages and conversations."""
     
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2", backend: str = "torch",
+                 cache_size: int = 10000):
         """
         Initialize embedding generator.
         
         Args:
             model_name: Name of the sentence transformer model to use
+            backend: "torch" for the default model, or "onnx-int8" to run the
+                INT8-quantized ONNX export through ONNX Runtime on CPU
+            cache_size: Maximum number of embeddings kept for reuse by encode_cached
         """
-        logger.info(f"Loading embedding model: {model_name}")
-        self.model = SentenceTransformer(model_name)
+        logger.info(f"Loading embedding model: {model_name} ({backend})")
+        self.model = _load_sentence_transformer(model_name, backend)
         self.model_name = model_name
         
+        # Most recently used embeddings, keyed by text digest, oldest first
+        self._embedding_cache: Dict[bytes, np.ndarray] = OrderedDict()
+        self.cache_size = cache_size
+        
+    @staticmethod
+    def _text_key(text: str) -> bytes:
+        """Short non-cryptographic digest used as the embedding cache key."""
+        return hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+    
+    def encode_cached(self, texts: List[str], batch_size: int = 100,
+                      show_progress_bar: bool = False) -> List[np.ndarray]:
+        """
+        Encode texts, reusing embeddings for recently seen texts.
+        
+        Returned vectors are read-only, since they are shared with the cache.
+        
+        Args:
+            texts: Texts to embed
+            batch_size: Batch size for the texts that still need encoding
+            show_progress_bar: Whether to show the encoder progress bar
+            
+        Returns:
+            List of embedding vectors in the same order as `texts`
+        """
+        keys = [self._text_key(text) for text in texts]
+        
+        # Look up each distinct text once; unseen ones are encoded once even if repeated
+        found = {}
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key in found or key in missing:
+                continue
+            if key in self._embedding_cache:
+                self._embedding_cache.move_to_end(key)
+                found[key] = self._embedding_cache[key]
+            else:
+                missing[key] = text
+        
+        if missing:
+            encoded = self.model.encode(list(missing.values()), batch_size=batch_size,
+                                        show_progress_bar=show_progress_bar)
+            for key, row in zip(missing, encoded):
+                # Copy each row so an evicted vector does not keep its whole batch alive
+                vector = np.array(row)
+                vector.setflags(write=False)
+                found[key] = self._embedding_cache[key] = vector
+            
+            # Drop the least recently used embeddings beyond the limit
+            while len(self._embedding_cache) > self.cache_size:
+                self._embedding_cache.popitem(last=False)
+        
+        return [found[key] for key in keys]
+        
     def generate_message_embeddings(self, messages: List[Dict[str, Any]]) -> List[np.ndarray]:
         """
         Generate embeddings for individual messages.
@@ -59,16 +148,9 @@ class ChatEmbeddingGenerator:
         
         logger.info(f"Generating embeddings for {len(texts)} messages")
         
-        # Generate embeddings in batches for efficiency
-        batch_size = 100
-        embeddings = []
-        
-        for i in range(0, len(texts), batch_size):
-            batch = texts[i:i + batch_size]
-            batch_embeddings = self.model.encode(batch, show_progress_bar=True)
-            embeddings.extend(batch_embeddings)
-        
-        return embeddings
+        # Encode everything in one call so the model length-sorts the whole
+        # corpus before batching, which keeps padding per batch to a minimum
+        return self.encode_cached(texts, batch_size=100, show_progress_bar=True)
     
     def generate_conversation_summary_embeddings(self, chat_data: Dict[str, Any]) -> Dict[str, np.ndarray]:
         """
@@ -120,25 +202,27 @@ class ChatEmbeddingGenerator:
                 summaries['recent_conversation'] = " ".join(recent_messages[-20:])
         
         # Generate embeddings for all summaries
-        embedding_dict = {}
-        for summary_type, text in summaries.items():
-            if text.strip():
-                embedding_dict[summary_type] = self.model.encode(text)
+        summary_types = [summary_type for summary_type, text in summaries.items() if text.strip()]
+        embeddings = self.encode_cached([summaries[summary_type] for summary_type in summary_types])
         
-        return embedding_dict
+        return dict(zip(summary_types, embeddings))
 
 
 class ChromaChatDatabase:
     """ChromaDB-based vector database for chat analysis."""
     
-    def __init__(self, db_path: str = "./data/embeddings/chroma_db"):
+    def __init__(self, db_path: str = "./data/embeddings/chroma_db",
+                 hnsw_params: Optional[Dict[str, Any]] = None):
         """
         Initialize ChromaDB instance.
         
         Args:
             db_path: Path to store ChromaDB files
+            hnsw_params: Optional "hnsw:*" collection metadata used when
+                collections are created, e.g. HNSW_PARAMS from config.settings
         """
         self.db_path = Path(db_path)
+        self.hnsw_params = hnsw_params or {}
         self.db_path.mkdir(parents=True, exist_ok=True)
         
         # Initialize ChromaDB
@@ -159,17 +243,17 @@ class ChromaChatDatabase:
         try:
             self.message_collection = self.client.get_or_create_collection(
                 name="messages",
-                metadata={"description": "Individual WhatsApp messages"}
+                metadata={"description": "Individual WhatsApp messages", **self.hnsw_params}
             )
             
             self.conversation_collection = self.client.get_or_create_collection(
                 name="conversations",
-                metadata={"description": "Conversation summaries and metadata"}
+                metadata={"description": "Conversation summaries and metadata", **self.hnsw_params}
             )
             
             self.friendship_collection = self.client.get_or_create_collection(
                 name="friendships",
-                metadata={"description": "Friendship patterns and insights"}
+                metadata={"description": "Friendship patterns and insights", **self.hnsw_params}
             )
             
             logger.info("ChromaDB collections initialized successfully")
@@ -236,6 +320,55 @@ class ChromaChatDatabase:
                 metadatas=metadatas
             )
     
+    def add_messages(self, messages: List[Dict[str, Any]],
+                     embeddings: Optional[List[np.ndarray]] = None,
+                     chat_name: str = 'Unknown'):
+        """
+        Upsert raw messages in a single ChromaDB call.
+        
+        Messages carrying a message_id get the same IDs as store_messages;
+        others fall back to sender, timestamp and position in the batch.
+        
+        Args:
+            messages: Message dictionaries with at least sender, timestamp and message
+            embeddings: Optional precomputed embeddings, one per message; when
+                omitted ChromaDB embeds the documents itself
+            chat_name: Chat name stored in each message's metadata
+        """
+        if embeddings is not None and len(messages) != len(embeddings):
+            logger.error(f"Mismatch between messages ({len(messages)}) and embeddings ({len(embeddings)})")
+            return
+        
+        ids = []
+        documents = []
+        metadatas = []
+        
+        for i, msg in enumerate(messages):
+            timestamp = msg['timestamp']
+            timestamp = timestamp.isoformat() if hasattr(timestamp, 'isoformat') else str(timestamp)
+            text_hash = hashlib.md5(msg['message'].encode()).hexdigest()[:8]
+            
+            if msg.get('message_id') is not None:
+                ids.append(f"{chat_name}_{msg['message_id']}_{text_hash}")
+            else:
+                ids.append(f"{chat_name}_{msg['sender']}_{timestamp}_{i}_{text_hash}")
+            documents.append(msg['message'])
+            metadatas.append({
+                'chat_name': chat_name,
+                'sender': msg['sender'],
+                'timestamp': timestamp,
+                'is_media': bool(msg.get('is_media', False))
+            })
+        
+        if not ids:
+            return
+        
+        logger.info(f"Upserting {len(ids)} messages for chat: {chat_name}")
+        kwargs = {'ids': ids, 'documents': documents, 'metadatas': metadatas}
+        if embeddings is not None:
+            kwargs['embeddings'] = [embedding.tolist() for embedding in embeddings]
+        self.message_collection.upsert(**kwargs)
+    
     def store_conversation_summaries(self, chat_data: Dict[str, Any], 
                                    summary_embeddings: Dict[str, np.ndarray]):
         """
@@ -294,17 +427,36 @@ class ChromaChatDatabase:
         Returns:
             List of relevant messages with metadata
         """
+        return self.search_messages_batch([query], chat_name, n_results)[0]
+    
+    def search_messages_batch(self, queries: List[str], chat_name: Optional[str] = None,
+                              n_results: int = 10) -> List[List[Dict[str, Any]]]:
+        """
+        Search for relevant messages for several queries in one ChromaDB call.
+        
+        Args:
+            queries: Search queries
+            chat_name: Optional filter by chat name
+            n_results: Number of results to return per query
+            
+        Returns:
+            One list of relevant messages per query, in query order
+        """
+        # ChromaDB rejects a query with no query texts
+        if not queries:
+            return []
+        
         where_filter = {}
         if chat_name:
             where_filter['chat_name'] = chat_name
         
         results = self.message_collection.query(
-            query_texts=[query],
+            query_texts=queries,
             n_results=n_results,
             where=where_filter if where_filter else None
         )
         
-        return self._format_search_results(results)
+        return [self._format_search_results(results, i) for i in range(len(queries))]
     
     def search_conversations(self, query: str, n_results: int = 5) -> List[Dict[str, Any]]:
         """
@@ -317,22 +469,40 @@ class ChromaChatDatabase:
         Returns:
             List of relevant conversations with metadata
         """
+        return self.search_conversations_batch([query], n_results)[0]
+    
+    def search_conversations_batch(self, queries: List[str],
+                                   n_results: int = 5) -> List[List[Dict[str, Any]]]:
+        """
+        Search for relevant conversations for several queries in one ChromaDB call.
+        
+        Args:
+            queries: Search queries
+            n_results: Number of results to return per query
+            
+        Returns:
+            One list of relevant conversations per query, in query order
+        """
+        # ChromaDB rejects a query with no query texts
+        if not queries:
+            return []
+        
         results = self.conversation_collection.query(
-            query_texts=[query],
+            query_texts=queries,
             n_results=n_results
         )
         
-        return self._format_search_results(results)
+        return [self._format_search_results(results, i) for i in range(len(queries))]
     
-    def _format_search_results(self, results: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Format ChromaDB results into a more usable format."""
+    def _format_search_results(self, results: Dict[str, Any], index: int = 0) -> List[Dict[str, Any]]:
+        """Format the ChromaDB results for the query at `index` into a more usable format."""
         formatted_results = []
         
-        if results['documents'] and results['documents'][0]:
-            documents = results['documents'][0]
-            metadatas = results['metadatas'][0] if results['metadatas'] else [{}] * len(documents)
-            distances = results['distances'][0] if results['distances'] else [0] * len(documents)
-            ids = results['ids'][0] if results['ids'] else list(range(len(documents)))
+        if results['documents'] and results['documents'][index]:
+            documents = results['documents'][index]
+            metadatas = results['metadatas'][index] if results['metadatas'] else [{}] * len(documents)
+            distances = results['distances'][index] if results['distances'] else [0] * len(documents)
+            ids = results['ids'][index] if results['ids'] else list(range(len(documents)))
             
             for doc, metadata, distance, doc_id in zip(documents, metadatas, distances, ids):
                 formatted_results.append({
@@ -359,15 +529,19 @@ class ChromaChatDatabase:
 class RAGChatAnalyzer:
     """Main RAG system for chat analysis."""
     
-    def __init__(self, db_path: str = "./data/embeddings/chroma_db"):
+    def __init__(self, db_path: str = "./data/embeddings/chroma_db",
+                 hnsw_params: Optional[Dict[str, Any]] = None,
+                 backend: str = "torch"):
         """
         Initialize RAG chat analyzer.
         
         Args:
             db_path: Path to ChromaDB storage
+            hnsw_params: Optional HNSW collection metadata passed to ChromaChatDatabase
+            backend: Embedding backend passed to ChatEmbeddingGenerator
         """
-        self.embedding_generator = ChatEmbeddingGenerator()
-        self.vector_db = ChromaChatDatabase(db_path)
+        self.embedding_generator = ChatEmbeddingGenerator(backend=backend)
+        self.vector_db = ChromaChatDatabase(db_path, hnsw_params)
         
     def process_chat_data(self, processed_data_dir: str):
         """
@@ -441,21 +615,42 @@ class RAGChatAnalyzer:
         Returns:
             Dictionary containing relevant context and metadata
         """
+        return self.query_insights_batch([query], context_limit)[0]
+    
+    def query_insights_batch(self, queries: List[str], context_limit: int = 5) -> List[Dict[str, Any]]:
+        """
+        Get insights for several natural language queries at once.
+        
+        All queries are embedded and searched in a single ChromaDB call per
+        collection instead of one round trip per query.
+        
+        Args:
+            queries: Natural language queries about friendships/patterns
+            context_limit: Number of relevant documents to retrieve per query
+            
+        Returns:
+            One context dictionary per query, in query order
+        """
+        if not queries:
+            return []
+        
         # Search for relevant messages
-        relevant_messages = self.vector_db.search_messages(query, n_results=context_limit)
+        relevant_messages = self.vector_db.search_messages_batch(queries, n_results=context_limit)
         
         # Search for relevant conversations
-        relevant_conversations = self.vector_db.search_conversations(query, n_results=context_limit)
+        relevant_conversations = self.vector_db.search_conversations_batch(queries, n_results=context_limit)
         
         # Combine and format results
-        context = {
-            'query': query,
-            'relevant_messages': relevant_messages,
-            'relevant_conversations': relevant_conversations,
-            'timestamp': datetime.now().isoformat()
-        }
-        
-        return context
+        timestamp = datetime.now().isoformat()
+        return [
+            {
+                'query': query,
+                'relevant_messages': messages,
+                'relevant_conversations': conversations,
+                'timestamp': timestamp
+            }
+            for query, messages, conversations in zip(queries, relevant_messages, relevant_conversations)
+        ]
     
     def get_database_stats(self) -> Dict[str, Any]:
         """Get statistics about the vector database."""
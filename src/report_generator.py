@@ -3,235 +3,206 @@ HTML Report Generator for WhatsApp Friendship Analysis
 Creates beautiful, shareable HTML reports with charts and insights
 """
 
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from html import escape
+import re
 from pathlib import Path
-import json
-from typing import Dict, List, Any
-import base64
+from typing import Dict, List, Any, Tuple
 
-class WhatsAppReportGenerator:
-    """Generate beautiful HTML reports from WhatsApp analysis data"""
-    
-    def __init__(self, output_dir: Path = None):
-        self.output_dir = output_dir or Path("data/analysis")
-        self.output_dir.mkdir(parents=True, exist_ok=True)
-    
-    def generate_report(self, analysis_data: Dict[str, Any], filename: str = None) -> Path:
-        """
-        Generate a comprehensive HTML report
-        
-        Args:
-            analysis_data: Dictionary containing all analysis results
-            filename: Optional custom filename
-            
-        Returns:
-            Path to generated HTML file
-        """
-        if filename is None:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"whatsapp_analysis_report_{timestamp}.html"
-        
-        output_path = self.output_dir / filename
-        
-        html_content = self._generate_html(analysis_data)
-        
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(html_content)
-        
-        print(f"\n✅ Report generated: {output_path}")
-        return output_path
-    
-    def generate_compact_card(self, analysis_data: Dict[str, Any], filename: str = None) -> Path:
-        """
-        Generate a compact, single-page card format report
-        
-        Args:
-            analysis_data: Dictionary containing all analysis results
-            filename: Optional custom filename
-            
-        Returns:
-            Path to generated compact HTML file
-        """
-        if filename is None:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"whatsapp_card_{timestamp}.html"
-        
-        output_path = self.output_dir / filename
-        
-        html_content = self._generate_compact_html(analysis_data)
-        
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(html_content)
-        
-        print(f"\n✅ Compact card generated: {output_path}")
-        return output_path
-    
-    def _generate_html(self, data: Dict[str, Any]) -> str:
-        """Generate the complete HTML document"""
-        
-        return f"""<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>WhatsApp Relationship Analysis Report</title>
-    <style>
-        * {{
+# Emoji shown next to each relationship type key
+_EMOJI_MAP = {
+    'romantic_dating': '💕',
+    'romantic_established': '❤️',
+    'close_friends': '👥',
+    'casual_friends': '🤝',
+    'family_sibling': '👨‍👩‍👧‍👦',
+    'family_parent': '👨‍👩‍👧',
+    'colleagues': '💼',
+    'work_professional': '🏢',
+    'boss_subordinate': '👔',
+    'acquaintances': '👋',
+    'enemy_conflict': '⚔️',
+    'new_acquaintance': '✨'
+}
+
+# Badge color for each confidence level
+_CONFIDENCE_COLOR = {
+    'VERY HIGH': '#4caf50',
+    'HIGH': '#66bb6a',
+    'MODERATE': '#ff9800',
+    'LOW': '#f44336'
+}
+
+def _esc(value: Any) -> str:
+    """HTML-escape any value, rendering non-strings the way an f-string would"""
+    return escape(str(value))
+
+def _minify_css(css: str) -> str:
+    """Strip comments and redundant whitespace from a static CSS block"""
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.DOTALL)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};:,])\s*', r'\1', css)
+    return css.strip()
+
+_REPORT_CSS = _minify_css("""
+        * {
             margin: 0;
             padding: 0;
             box-sizing: border-box;
-        }}
+        }
         
-        body {{
+        body {
             font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
             background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
             min-height: 100vh;
             padding: 20px;
-        }}
+        }
         
-        .container {{
+        .container {
             max-width: 1200px;
             margin: 0 auto;
             background: white;
             border-radius: 20px;
             box-shadow: 0 20px 60px rgba(0,0,0,0.3);
             overflow: hidden;
-        }}
+        }
         
-        .header {{
+        .header {
             background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
             color: white;
             padding: 40px;
             text-align: center;
-        }}
+        }
         
-        .header h1 {{
+        .header h1 {
             font-size: 2.5em;
             margin-bottom: 10px;
             text-shadow: 2px 2px 4px rgba(0,0,0,0.2);
-        }}
+        }
         
-        .header .subtitle {{
+        .header .subtitle {
             font-size: 1.2em;
             opacity: 0.9;
-        }}
+        }
         
-        .content {{
+        .content {
             padding: 40px;
-        }}
+        }
         
-        .section {{
+        .section {
             margin-bottom: 40px;
             border-bottom: 2px solid #f0f0f0;
             padding-bottom: 30px;
-        }}
+        }
         
-        .section:last-child {{
+        .section:last-child {
             border-bottom: none;
-        }}
+        }
         
-        .section-title {{
+        .section-title {
             font-size: 2em;
             color: #667eea;
             margin-bottom: 20px;
             display: flex;
             align-items: center;
             gap: 10px;
-        }}
+        }
         
-        .stat-grid {{
+        .stat-grid {
             display: grid;
             grid-template-columns: repeat(auto-fit, minmax(250px, 1fr));
             gap: 20px;
             margin-top: 20px;
-        }}
+        }
         
-        .stat-card {{
+        .stat-card {
             background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
             color: white;
             padding: 25px;
             border-radius: 15px;
             box-shadow: 0 5px 15px rgba(102, 126, 234, 0.3);
             transition: transform 0.3s ease;
-        }}
+        }
         
-        .stat-card:hover {{
+        .stat-card:hover {
             transform: translateY(-5px);
-        }}
+        }
         
-        .stat-label {{
+        .stat-label {
             font-size: 0.9em;
             opacity: 0.9;
             margin-bottom: 5px;
-        }}
+        }
         
-        .stat-value {{
+        .stat-value {
             font-size: 2.5em;
             font-weight: bold;
             margin-bottom: 5px;
-        }}
+        }
         
-        .stat-description {{
+        .stat-description {
             font-size: 0.85em;
             opacity: 0.8;
-        }}
+        }
         
-        .participant-card {{
+        .participant-card {
             background: #f8f9fa;
             border-left: 5px solid #667eea;
             padding: 20px;
             margin: 15px 0;
             border-radius: 10px;
-        }}
+        }
         
-        .participant-name {{
+        .participant-name {
             font-size: 1.5em;
             color: #667eea;
             font-weight: bold;
             margin-bottom: 15px;
-        }}
+        }
         
-        .trait {{
+        .trait {
             display: flex;
             align-items: center;
             margin: 10px 0;
             font-size: 1.05em;
-        }}
+        }
         
-        .trait-icon {{
+        .trait-icon {
             margin-right: 10px;
             font-size: 1.3em;
-        }}
+        }
         
-        .judgment-box {{
+        .judgment-box {
             background: linear-gradient(135deg, #f093fb 0%, #f5576c 100%);
             color: white;
             padding: 30px;
             border-radius: 15px;
             margin: 20px 0;
             box-shadow: 0 10px 30px rgba(245, 87, 108, 0.3);
-        }}
+        }
         
-        .judgment-title {{
+        .judgment-title {
             font-size: 1.8em;
             font-weight: bold;
             margin-bottom: 15px;
             text-align: center;
-        }}
+        }
         
-        .judgment-content {{
+        .judgment-content {
             font-size: 1.1em;
             line-height: 1.8;
-        }}
+        }
         
-        .indicator-list {{
+        .indicator-list {
             background: #f8f9fa;
             padding: 20px;
             border-radius: 10px;
             margin: 15px 0;
-        }}
+        }
         
-        .indicator-item {{
+        .indicator-item {
             display: flex;
             align-items: flex-start;
             margin: 12px 0;
@@ -239,9 +210,9 @@ class WhatsAppReportGenerator:
             background: white;
             border-radius: 8px;
             box-shadow: 0 2px 5px rgba(0,0,0,0.05);
-        }}
+        }
         
-        .indicator-number {{
+        .indicator-number {
             background: #667eea;
             color: white;
             width: 30px;
@@ -253,17 +224,17 @@ class WhatsAppReportGenerator:
             font-weight: bold;
             margin-right: 15px;
             flex-shrink: 0;
-        }}
+        }
         
-        .progress-bar {{
+        .progress-bar {
             background: #e9ecef;
             height: 30px;
             border-radius: 15px;
             overflow: hidden;
             margin: 10px 0;
-        }}
+        }
         
-        .progress-fill {{
+        .progress-fill {
             background: linear-gradient(90deg, #667eea 0%, #764ba2 100%);
             height: 100%;
             display: flex;
@@ -272,9 +243,9 @@ class WhatsAppReportGenerator:
             color: white;
             font-weight: bold;
             transition: width 1s ease;
-        }}
+        }
         
-        .score-badge {{
+        .score-badge {
             display: inline-block;
             background: #667eea;
             color: white;
@@ -282,15 +253,15 @@ class WhatsAppReportGenerator:
             border-radius: 20px;
             font-weight: bold;
             margin: 5px;
-        }}
+        }
         
-        .timeline {{
+        .timeline {
             position: relative;
             padding-left: 30px;
             margin: 20px 0;
-        }}
+        }
         
-        .timeline::before {{
+        .timeline::before {
             content: '';
             position: absolute;
             left: 10px;
@@ -298,17 +269,17 @@ class WhatsAppReportGenerator:
             bottom: 0;
             width: 3px;
             background: #667eea;
-        }}
+        }
         
-        .timeline-item {{
+        .timeline-item {
             position: relative;
             margin: 20px 0;
             padding: 15px 20px;
             background: #f8f9fa;
             border-radius: 10px;
-        }}
+        }
         
-        .timeline-item::before {{
+        .timeline-item::before {
             content: '';
             position: absolute;
             left: -24px;
@@ -318,97 +289,108 @@ class WhatsAppReportGenerator:
             border-radius: 50%;
             background: #667eea;
             border: 3px solid white;
-        }}
+        }
         
-        .footer {{
+        .footer {
             background: #f8f9fa;
             padding: 30px;
             text-align: center;
             color: #666;
-        }}
+        }
         
-        .emoji-large {{
+        .emoji-large {
             font-size: 3em;
             text-align: center;
             margin: 20px 0;
-        }}
+        }
         
-        @media print {{
-            body {{
+        @media print {
+            body {
                 background: white !important;
                 padding: 0;
                 -webkit-print-color-adjust: exact !important;
                 print-color-adjust: exact !important;
                 color-adjust: exact !important;
-            }}
+            }
             
-            .container {{
+            .container {
                 box-shadow: none;
                 max-width: 100%;
-            }}
+            }
             
             /* Ensure all text is dark and readable */
-            * {{
+            * {
                 -webkit-print-color-adjust: exact !important;
                 print-color-adjust: exact !important;
                 color-adjust: exact !important;
-            }}
+            }
             
             /* Force dark text for headings */
-            h1, h2, h3, h4, h5, h6 {{
+            h1, h2, h3, h4, h5, h6 {
                 color: #000000 !important;
                 page-break-after: avoid;
-            }}
+            }
             
-            .header h1 {{
+            .header h1 {
                 color: #000000 !important;
-            }}
+            }
             
-            .section-title {{
+            .section-title {
                 color: #000000 !important;
                 page-break-after: avoid;
-            }}
+            }
             
             /* Ensure body text is dark */
-            p, div, span, li {{
+            p, div, span, li {
                 color: #000000 !important;
-            }}
+            }
             
             /* Keep gradient backgrounds visible */
-            .stat-box, .score-badge, .judgment-box {{
+            .stat-box, .score-badge, .judgment-box {
                 -webkit-print-color-adjust: exact !important;
                 print-color-adjust: exact !important;
-            }}
+            }
             
             /* Prevent page breaks inside important sections */
-            .section, .stat-box, .indicator-item {{
+            .section, .stat-box, .indicator-item {
                 page-break-inside: avoid;
-            }}
+            }
             
             /* Ensure progress bars show */
-            .progress-bar {{
+            .progress-bar {
                 border: 1px solid #000 !important;
-            }}
+            }
             
-            .progress-fill {{
+            .progress-fill {
                 -webkit-print-color-adjust: exact !important;
                 print-color-adjust: exact !important;
-            }}
-        }}
+            }
+        }
         
-        @media (max-width: 768px) {{
-            .header h1 {{
+        @media (max-width: 768px) {
+            .header h1 {
                 font-size: 1.8em;
-            }}
+            }
             
-            .stat-grid {{
+            .stat-grid {
                 grid-template-columns: 1fr;
-            }}
+            }
             
-            .content {{
+            .content {
                 padding: 20px;
-            }}
-        }}
+            }
+        }
+""")
+
+# Static skeleton of the full report, filled in with %-formatting
+_REPORT_SKELETON = """<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>WhatsApp Relationship Analysis Report</title>
+    <style>
+        """ + _REPORT_CSS.replace('%', '%%') + """
     </style>
 </head>
 <body>
@@ -417,26 +399,520 @@ class WhatsAppReportGenerator:
             <h1>💬 WhatsApp Relationship Analysis</h1>
             <div class="subtitle">Deep Behavioral & Psychological Insights</div>
             <div class="subtitle" style="margin-top: 10px; opacity: 0.7;">
-                Generated on {datetime.now().strftime("%B %d, %Y at %I:%M %p")}
+                Generated on %(timestamp)s
             </div>
         </div>
         
         <div class="content">
-            {self._generate_overview_section(data)}
-            {self._generate_relationship_classification(data)}
-            {self._generate_communication_analysis(data)}
-            {self._generate_personality_profiles(data)}
-            {self._generate_behavioral_indicators(data)}
-            {self._generate_final_judgment(data)}
+            %(overview)s
+            %(classification)s
+            %(communication)s
+            %(personality)s
+            %(behavioral)s
+            %(judgment)s
+        </div>
+        
+        <div class="footer">
+            <p>🔒 This analysis is based on statistical patterns and behavioral psychology.</p>
+            <p style="margin-top: 10px;">Generated by WhatsApp Friendship Analyzer</p>
         </div>
+    </div>
+</body>
+</html>"""
+
+_CARD_CSS = _minify_css("""
+        @media print {
+            @page { 
+                size: A4; 
+                margin: 10mm; 
+            }
+            
+            body { 
+                margin: 0; 
+                padding: 20px;
+                -webkit-print-color-adjust: exact !important;
+                print-color-adjust: exact !important;
+                color-adjust: exact !important;
+            }
+            
+            /* Force all colors to print exactly as shown */
+            * {
+                -webkit-print-color-adjust: exact !important;
+                print-color-adjust: exact !important;
+                color-adjust: exact !important;
+            }
+            
+            /* Ensure headings are dark */
+            .relationship-type, .confidence, strong, h3 {
+                color: #000000 !important;
+            }
+            
+            /* Keep gradient backgrounds */
+            .stat-box, .card {
+                -webkit-print-color-adjust: exact !important;
+                print-color-adjust: exact !important;
+            }
+            
+            /* Ensure text contrast */
+            .stat-label, .stat-value {
+                color: #ffffff !important;
+                text-shadow: 0 1px 2px rgba(0,0,0,0.3);
+            }
+            
+            /* Keep insight text dark */
+            .insight-item {
+                color: #000000 !important;
+            }
+            
+            /* Progress bars */
+            .progress-bar {
+                border: 1px solid #ddd !important;
+            }
+            
+            .progress-fill {
+                -webkit-print-color-adjust: exact !important;
+                print-color-adjust: exact !important;
+            }
+        }
+        
+        * {
+            margin: 0;
+            padding: 0;
+            box-sizing: border-box;
+        }
+        
+        body {
+            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Arial, sans-serif;
+            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+            padding: 20px;
+            min-height: 100vh;
+            display: flex;
+            align-items: center;
+            justify-content: center;
+        }
+        
+        .card {
+            background: white;
+            border-radius: 20px;
+            padding: 40px;
+            max-width: 800px;
+            width: 100%;
+            box-shadow: 0 20px 60px rgba(0,0,0,0.3);
+        }
+        
+        .header {
+            text-align: center;
+            margin-bottom: 30px;
+            padding-bottom: 20px;
+            border-bottom: 2px solid #f0f0f0;
+        }
+        
+        .emoji-large {
+            font-size: 60px;
+            margin-bottom: 10px;
+        }
+        
+        .relationship-type {
+            font-size: 28px;
+            font-weight: bold;
+            color: #667eea;
+            margin-bottom: 5px;
+        }
+        
+        .confidence {
+            font-size: 14px;
+            color: #666;
+            text-transform: uppercase;
+            letter-spacing: 1px;
+        }
+        
+        .stats-grid {
+            display: grid;
+            grid-template-columns: repeat(auto-fit, minmax(180px, 1fr));
+            gap: 15px;
+            margin: 25px 0;
+        }
+        
+        .stat-box {
+            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+            padding: 20px;
+            border-radius: 12px;
+            color: white;
+            text-align: center;
+        }
+        
+        .stat-value {
+            font-size: 32px;
+            font-weight: bold;
+            display: block;
+            margin-bottom: 5px;
+        }
+        
+        .stat-label {
+            font-size: 12px;
+            opacity: 0.9;
+            text-transform: uppercase;
+            letter-spacing: 0.5px;
+        }
+        
+        .insights {
+            margin-top: 25px;
+        }
+        
+        .insight-item {
+            background: #f8f9fa;
+            padding: 12px 15px;
+            margin: 8px 0;
+            border-radius: 8px;
+            font-size: 14px;
+            display: flex;
+            align-items: center;
+            gap: 10px;
+        }
+        
+        .insight-icon {
+            font-size: 20px;
+        }
+        
+        .scores-section {
+            margin-top: 25px;
+            padding-top: 20px;
+            border-top: 2px solid #f0f0f0;
+        }
+        
+        .score-bar {
+            margin: 10px 0;
+        }
+        
+        .score-label {
+            font-size: 13px;
+            margin-bottom: 5px;
+            display: flex;
+            justify-content: space-between;
+        }
+        
+        .progress-bar {
+            height: 6px;
+            background: #e0e0e0;
+            border-radius: 3px;
+            overflow: hidden;
+        }
+        
+        .progress-fill {
+            height: 100%;
+            background: linear-gradient(90deg, #667eea 0%, #764ba2 100%);
+            transition: width 0.3s ease;
+        }
+        
+        .footer {
+            margin-top: 25px;
+            padding-top: 20px;
+            border-top: 2px solid #f0f0f0;
+            text-align: center;
+            font-size: 12px;
+            color: #999;
+        }
+""")
+
+# Static skeleton of the compact card, filled in with %-formatting
+_CARD_SKELETON = """<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>WhatsApp Relationship Card</title>
+    <style>
+        """ + _CARD_CSS.replace('%', '%%') + """
+    </style>
+</head>
+<body>
+    <div class="card">
+        <div class="header">
+            <div class="emoji-large">%(top_emoji)s</div>
+            <div class="relationship-type">%(top_label)s</div>
+            <div class="confidence">Confidence: %(confidence)s (%(top_score)s)</div>
+            <div style="margin-top: 10px; font-size: 14px; color: #666;">%(interpretation)s</div>
+        </div>
+        
+        <div class="stats-grid">
+            <div class="stat-box">
+                <span class="stat-value">%(total_messages)s</span>
+                <span class="stat-label">Messages</span>
+            </div>
+            <div class="stat-box">
+                <span class="stat-value">%(duration_days)s</span>
+                <span class="stat-label">Days</span>
+            </div>
+            <div class="stat-box">
+                <span class="stat-value">%(msgs_per_day)s</span>
+                <span class="stat-label">Msgs/Day</span>
+            </div>
+            <div class="stat-box">
+                <span class="stat-value">%(participant_count)s</span>
+                <span class="stat-label">People</span>
+            </div>
+        </div>
+        
+        <div class="insights">
+            <strong style="font-size: 16px; display: block; margin-bottom: 10px;">📊 Key Insights</strong>
+            
+            <div class="insight-item">
+                <span class="insight-icon">🗣️</span>
+                <span>Casual: %(casual_pct)s%% | Formal: %(formal_pct)s%%</span>
+            </div>
+            
+            <div class="insight-item">
+                <span class="insight-icon">💬</span>
+                <span>%(conversation_summary)s</span>
+            </div>
+            
+            %(key_insight)s
+        </div>
+        
+        <div class="scores-section">
+            <strong style="font-size: 16px; display: block; margin-bottom: 15px;">🎯 Relationship Scores</strong>
+            %(scores)s
+        </div>
+        
+        <div class="footer">
+            <p>WhatsApp Friendship Analyzer | Generated %(generated_date)s</p>
+            <p style="margin-top: 5px;">Participants: %(participant_display)s</p>
+        </div>
+    </div>
+</body>
+</html>"""
+
+# Behavioral indicator rules: (section, key, tiers, alternate trigger).
+# Tiers are (threshold, message) pairs checked in order; the first exceeded
+# threshold wins. Section None reads from the top level of the analysis data.
+_INDICATOR_RULES = [
+    ('tone_analysis', 'casual_percentage', [
+        (20, "Very casual/slang language ({v:.1f}%) - typical of close friendships"),
+        (10, "Moderate casual language ({v:.1f}%) - comfortable relationship"),
+    ], None),
+    ('tone_analysis', 'formal_percentage', [
+        (15, "Formal/polite language ({v:.1f}%) - professional or new relationship"),
+    ], None),
+    ('tone_analysis', 'roasting_percentage', [
+        (1, "Playful roasting/insults detected ({v:.1f}%) - close friends who joke around"),
+    ], ('insult_percentage', 2)),
+    ('content_analysis', 'shared_parent_percentage', [
+        (2, "⭐ Frequent shared parent references ({v:.1f}%) - STRONG sibling indicator!"),
+        (0.5, "Shared parent discussions ({v:.1f}%) - possible siblings"),
+    ], None),
+    ('content_analysis', 'future_life_percentage', [
+        (1, "⭐ Life planning discussions ({v:.1f}%) - serious romantic or family relationship"),
+        (0.3, "Future life discussions ({v:.1f}%) - long-term relationship"),
+    ], None),
+    ('content_analysis', 'future_living_percentage', [
+        (0.5, "Living together discussions ({v:.1f}%) - roommates or romantic partners"),
+    ], None),
+    ('content_analysis', 'future_business_percentage', [
+        (1, "Business planning ({v:.1f}%) - work partners or entrepreneurs"),
+    ], None),
+    ('content_analysis', 'future_travel_percentage', [
+        (1, "Travel planning together ({v:.1f}%) - close relationship"),
+    ], None),
+    (None, 'total_greetings', [
+        (10, "Regular good morning/night greetings ({v} times) - intimate behavior"),
+    ], None),
+    (None, 'total_affection', [
+        (20, "Frequent affectionate language ({v} times) - romantic or very close"),
+    ], None),
+    (None, 'night_percentage', [
+        (20, "High late-night messaging ({v:.1f}%) - close relationship"),
+    ], None),
+]
+
+# Compact card key insights. Group chats always get _GROUP_INSIGHT; otherwise
+# _INSIGHT_RULES (section, key, threshold, markup) are checked in order and the
+# first exceeded threshold wins, falling back to _DEFAULT_INSIGHT
+_GROUP_INSIGHT = '<div class="insight-item"><span class="insight-icon">👥</span><span>Active group dynamic with regular participation</span></div>'
+_INSIGHT_RULES = [
+    ('content_analysis', 'shared_parent_percentage', 2,
+     '<div class="insight-item"><span class="insight-icon">⭐</span><span>Strong sibling indicators detected</span></div>'),
+    ('content_analysis', 'future_life_percentage', 1,
+     '<div class="insight-item"><span class="insight-icon">🔮</span><span>Serious future planning discussions</span></div>'),
+    ('tone_analysis', 'casual_percentage', 25,
+     '<div class="insight-item"><span class="insight-icon">😎</span><span>Very casual and comfortable communication</span></div>'),
+    (None, 'night_percentage', 20,
+     '<div class="insight-item"><span class="insight-icon">🌙</span><span>Frequent late-night conversations</span></div>'),
+]
+_DEFAULT_INSIGHT = '<div class="insight-item"><span class="insight-icon">💭</span><span>Consistent and balanced communication</span></div>'
+
+# One compact card score bar, filled in with %-formatting
+_SCORE_BAR = """
+            <div class="score-bar">
+                <div class="score-label">
+                    <span>%(label)s</span>
+                    <span>%(score)s</span>
+                </div>
+                <div class="progress-bar">
+                    <div class="progress-fill" style="width: %(percentage).1f%%"></div>
+                </div>
+            </div>
+            """
+
+# Default filename prefix for each render mode
+_FILENAME_PREFIXES = {
+    'full': 'whatsapp_analysis_report',
+    'compact': 'whatsapp_card'
+}
+
+
+def _top_relationship(scores: Dict[str, Any]) -> Tuple[Any, Any]:
+    """Return the highest scoring (type, score) pair in one pass, or (None, None)"""
+    best_k, best_v = None, None
+    for k, v in scores.items():
+        if best_k is None or v > best_v:
+            best_k, best_v = k, v
+    return best_k, best_v
+
+class WhatsAppReportGenerator:
+    """Generate beautiful HTML reports from WhatsApp analysis data"""
+    
+    def __init__(self, output_dir: Path = None):
+        self.output_dir = output_dir or Path("data/analysis")
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+    
+    def generate_report(self, analysis_data: Dict[str, Any], filename: str = None) -> Path:
+        """
+        Generate a comprehensive HTML report
+        
+        Args:
+            analysis_data: Dictionary containing all analysis results
+            filename: Optional custom filename
+            
+        Returns:
+            Path to generated HTML file
+        """
+        output_path, html_content = self._prepare(analysis_data, filename, 'full')
+        
+        self._write_html(output_path, html_content)
+        
+        print(f"\n✅ Report generated: {output_path}")
+        return output_path
+    
+    def generate_compact_card(self, analysis_data: Dict[str, Any], filename: str = None) -> Path:
+        """
+        Generate a compact, single-page card format report
+        
+        Args:
+            analysis_data: Dictionary containing all analysis results
+            filename: Optional custom filename
+            
+        Returns:
+            Path to generated compact HTML file
+        """
+        output_path, html_content = self._prepare(analysis_data, filename, 'compact')
+        
+        self._write_html(output_path, html_content)
+        
+        print(f"\n✅ Compact card generated: {output_path}")
+        return output_path
+    
+    async def generate_report_async(self, analysis_data: Dict[str, Any], filename: str = None) -> Path:
+        """
+        Generate a comprehensive HTML report without blocking the event loop
+        
+        The HTML is built on the calling thread and the file write runs in a
+        worker thread, so several reports can be written concurrently with
+        asyncio.gather.
+        
+        Args:
+            analysis_data: Dictionary containing all analysis results
+            filename: Optional custom filename
+            
+        Returns:
+            Path to generated HTML file
+        """
+        output_path, html_content = self._prepare(analysis_data, filename, 'full')
+        
+        await asyncio.to_thread(self._write_html, output_path, html_content)
+        
+        print(f"\n✅ Report generated: {output_path}")
+        return output_path
+    
+    async def generate_compact_card_async(self, analysis_data: Dict[str, Any], filename: str = None) -> Path:
+        """
+        Generate a compact card report without blocking the event loop
+        
+        Args:
+            analysis_data: Dictionary containing all analysis results
+            filename: Optional custom filename
+            
+        Returns:
+            Path to generated compact HTML file
+        """
+        output_path, html_content = self._prepare(analysis_data, filename, 'compact')
+        
+        await asyncio.to_thread(self._write_html, output_path, html_content)
+        
+        print(f"\n✅ Compact card generated: {output_path}")
+        return output_path
+    
+    def generate_batch(self, items: List[Tuple[Dict[str, Any], str]], max_workers: int = 4,
+                       mode: str = 'full') -> List[Path]:
+        """
+        Generate several reports, overlapping their file writes
+        
+        All documents are rendered first, then written concurrently from a
+        thread pool so the writes are not serialized behind one another.
+        
+        Args:
+            items: (analysis_data, filename) pairs, one per report
+            max_workers: Maximum number of concurrent writes
+            mode: 'full' for complete reports, 'compact' for cards
+            
+        Returns:
+            Paths to the generated HTML files, in input order
+        """
+        now = datetime.now()
+        rendered = [
+            (self.output_dir / filename, self._render(analysis_data, mode, now))
+            for analysis_data, filename in items
+        ]
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(lambda job: self._write_html(*job), rendered))
+        
+        output_paths = [output_path for output_path, _ in rendered]
+        print(f"\n✅ {len(output_paths)} reports generated in {self.output_dir}")
+        return output_paths
+    
+    def _prepare(self, analysis_data: Dict[str, Any], filename: str, mode: str) -> Tuple[Path, str]:
+        """Resolve the output path and render the document for a single report"""
+        now = datetime.now()
+        if filename is None:
+            timestamp = now.strftime("%Y%m%d_%H%M%S")
+            filename = f"{_FILENAME_PREFIXES[mode]}_{timestamp}.html"
         
-        <div class="footer">
-            <p>🔒 This analysis is based on statistical patterns and behavioral psychology.</p>
-            <p style="margin-top: 10px;">Generated by WhatsApp Friendship Analyzer</p>
-        </div>
-    </div>
-</body>
-</html>"""
+        return self.output_dir / filename, self._render(analysis_data, mode, now)
+    
+    def _render(self, data: Dict[str, Any], mode: str, now: datetime = None) -> str:
+        """Render either the full report ('full') or the compact card ('compact')"""
+        if mode == 'compact':
+            return self._generate_compact_html(data, now)
+        return self._generate_html(data, now)
+    
+    def _write_html(self, output_path: Path, html_content: str) -> None:
+        """Encode the document once and write it through a binary handle"""
+        with open(output_path, 'wb') as f:
+            f.write(html_content.encode('utf-8'))
+    
+    def _generate_html(self, data: Dict[str, Any], now: datetime = None) -> str:
+        """Generate the complete HTML document"""
+        now = now or datetime.now()
+        
+        return _REPORT_SKELETON % {
+            'timestamp': now.strftime("%B %d, %Y at %I:%M %p"),
+            'overview': self._generate_overview_section(data),
+            'classification': self._generate_relationship_classification(data),
+            'communication': self._generate_communication_analysis(data),
+            'personality': self._generate_personality_profiles(data),
+            'behavioral': self._generate_behavioral_indicators(data),
+            'judgment': self._generate_final_judgment(data),
+        }
     
     def _generate_overview_section(self, data: Dict) -> str:
         """Generate overview statistics section"""
@@ -453,7 +929,7 @@ class WhatsAppReportGenerator:
                 <div class="stat-card">
                     <div class="stat-label">Participants</div>
                     <div class="stat-value">{len(participants)}</div>
-                    <div class="stat-description">{', '.join(participants)}</div>
+                    <div class="stat-description">{_esc(', '.join(participants))}</div>
                 </div>
                 
                 <div class="stat-card">
@@ -484,45 +960,26 @@ class WhatsAppReportGenerator:
         relationship_scores = data.get('relationship_scores', {})
         relationship_type_map = data.get('relationship_type_map', {})
         
-        confidence_color = {
-            'VERY HIGH': '#4caf50',
-            'HIGH': '#66bb6a',
-            'MODERATE': '#ff9800',
-            'LOW': '#f44336'
-        }.get(confidence, '#999')
-        
-        # Get emoji for relationship type
-        emoji_map = {
-            'romantic': '💕',
-            'close_friends': '👥',
-            'casual_friends': '🤝',
-            'family_sibling': '👨‍👩‍👧‍👦',
-            'family_parent': '👨‍👩‍👧',
-            'colleagues': '💼',
-            'work_professional': '🏢',
-            'boss_subordinate': '👔',
-            'acquaintances': '👋',
-            'enemy_conflict': '⚔️',
-            'new_acquaintance': '✨',
-        }
+        confidence_color = _CONFIDENCE_COLOR.get(confidence, '#999')
         
         # Generate progress bars for top 5 relationship types
-        relationship_bars_html = ""
+        relationship_bars = []
         if relationship_scores and relationship_type_map:
             # Sort by score descending
             sorted_scores = sorted(relationship_scores.items(), key=lambda x: x[1], reverse=True)[:5]
             max_score = max(relationship_scores.values()) if relationship_scores else 100
+            scale = 100 / max(max_score, 1)
             
             for rel_key, score in sorted_scores:
                 rel_name = relationship_type_map.get(rel_key, rel_key)
                 # Get emoji for this type
-                emoji = next((v for k, v in emoji_map.items() if k in rel_key), '🔹')
-                percentage = (score / max(max_score, 1)) * 100
+                emoji = _EMOJI_MAP.get(rel_key, '🔹')
+                percentage = score * scale
                 
-                relationship_bars_html += f"""
+                relationship_bars.append(f"""
                 <div style="margin-bottom: 20px;">
                     <div style="display: flex; justify-content: space-between; margin-bottom: 5px;">
-                        <span>{emoji} {rel_name}</span>
+                        <span>{emoji} {_esc(rel_name)}</span>
                         <span>{score}/{max_score}</span>
                     </div>
                     <div class="progress-bar">
@@ -531,7 +988,8 @@ class WhatsAppReportGenerator:
                         </div>
                     </div>
                 </div>
-                """
+                """)
+            relationship_bars_html = "".join(relationship_bars)
         else:
             # Fallback to old romantic score display
             romantic_score = data.get('romantic_score', 0)
@@ -555,15 +1013,15 @@ class WhatsAppReportGenerator:
             
             <div class="judgment-box">
                 <div class="judgment-title">
-                    {relationship_type}
+                    {_esc(relationship_type)}
                 </div>
                 <div style="text-align: center; margin: 20px 0;">
                     <span class="score-badge" style="background: {confidence_color}; font-size: 1.2em;">
-                        Confidence: {confidence}
+                        Confidence: {_esc(confidence)}
                     </span>
                 </div>
                 <div class="judgment-content" style="text-align: center;">
-                    {data.get('relationship_interpretation', 'Analysis based on communication patterns and behavioral indicators.')}
+                    {_esc(data.get('relationship_interpretation', 'Analysis based on communication patterns and behavioral indicators.'))}
                 </div>
             </div>
             
@@ -601,19 +1059,20 @@ class WhatsAppReportGenerator:
     def _generate_message_distribution(self, message_counts: Dict) -> str:
         """Generate message distribution cards"""
         total = sum(message_counts.values()) if message_counts else 1
-        cards = ""
+        scale = 100 / total
+        cards = []
         
         for person, count in message_counts.items():
-            percentage = (count / total) * 100
-            cards += f"""
+            percentage = count * scale
+            cards.append(f"""
                 <div class="stat-card">
-                    <div class="stat-label">{person}</div>
+                    <div class="stat-label">{_esc(person)}</div>
                     <div class="stat-value">{count}</div>
                     <div class="stat-description">{percentage:.1f}% of messages</div>
                 </div>
-            """
+            """)
         
-        return cards
+        return "".join(cards)
     
     def _generate_initiation_stats(self, conversation_starts: Dict) -> str:
         """Generate conversation initiation stats"""
@@ -621,107 +1080,108 @@ class WhatsAppReportGenerator:
             return ""
         
         total = sum(conversation_starts.values())
-        cards = ""
+        scale = 100 / total
+        cards = []
         
         for person, count in conversation_starts.items():
-            percentage = (count / total) * 100
-            cards += f"""
+            percentage = count * scale
+            cards.append(f"""
                 <div class="stat-card">
-                    <div class="stat-label">{person} Initiated</div>
+                    <div class="stat-label">{_esc(person)} Initiated</div>
                     <div class="stat-value">{count}</div>
                     <div class="stat-description">{percentage:.1f}% of conversations</div>
                 </div>
-            """
+            """)
         
-        return cards
+        return "".join(cards)
     
     def _generate_response_stats(self, data: Dict) -> str:
         """Generate response time statistics"""
         response_times = data.get('response_times_by_person', {})
-        cards = ""
+        cards = []
         
         for person, times in response_times.items():
-            if times:
-                import statistics
-                avg = statistics.mean(times)
-                cards += f"""
+            # Accept plain lists as well as NumPy arrays from a vectorized upstream
+            if len(times):
+                avg = times.mean() if hasattr(times, 'mean') else sum(times) / len(times)
+                cards.append(f"""
                     <div class="stat-card">
-                        <div class="stat-label">{person} Response</div>
+                        <div class="stat-label">{_esc(person)} Response</div>
                         <div class="stat-value">{avg:.0f}m</div>
                         <div class="stat-description">Average response time</div>
                     </div>
-                """
+                """)
         
-        return cards
+        return "".join(cards)
     
     def _generate_timeline_items(self, data: Dict) -> str:
         """Generate timeline items for key metrics"""
-        items = ""
+        items = []
         
         # Late night messaging
         night_pct = data.get('night_percentage', 0)
-        items += f"""
+        items.append(f"""
             <div class="timeline-item">
                 <strong>🌙 Late-Night Communication:</strong> {night_pct:.1f}% of messages sent after 11 PM
             </div>
-        """
+        """)
         
         # Greetings
         greetings = data.get('total_greetings', 0)
-        items += f"""
+        items.append(f"""
             <div class="timeline-item">
                 <strong>☀️ Good Morning/Night Rituals:</strong> {greetings} instances detected
             </div>
-        """
+        """)
         
         # Affectionate language
         affection = data.get('total_affection', 0)
-        items += f"""
+        items.append(f"""
             <div class="timeline-item">
                 <strong>❤️ Affectionate Language:</strong> {affection} instances of intimate terms
             </div>
-        """
+        """)
         
-        return items
+        return "".join(items)
     
     def _generate_personality_profiles(self, data: Dict) -> str:
         """Generate personality profiles for participants"""
         profiles = data.get('personality_profiles', {})
         
-        section = """
+        section = ["""
         <div class="section">
             <div class="section-title">🧠 Personality Profiles</div>
-        """
+        """]
         
         for person, traits in profiles.items():
-            section += f"""
+            section.append(f"""
             <div class="participant-card">
-                <div class="participant-name">{person}</div>
+                <div class="participant-name">{_esc(person)}</div>
                 <div class="trait">
                     <span class="trait-icon">📝</span>
-                    <span>{traits.get('communication_style', 'Communicator')}</span>
+                    <span>{_esc(traits.get('communication_style', 'Communicator'))}</span>
                 </div>
                 <div class="trait">
                     <span class="trait-icon">⚡</span>
-                    <span>{traits.get('response_style', 'Responder')}</span>
+                    <span>{_esc(traits.get('response_style', 'Responder'))}</span>
                 </div>
                 <div class="trait">
                     <span class="trait-icon">💭</span>
-                    <span>{traits.get('texting_pattern', 'Texter')}</span>
+                    <span>{_esc(traits.get('texting_pattern', 'Texter'))}</span>
                 </div>
                 <div class="trait">
                     <span class="trait-icon">😊</span>
-                    <span>{traits.get('expression_style', 'Expressive')}</span>
+                    <span>{_esc(traits.get('expression_style', 'Expressive'))}</span>
                 </div>
                 <div class="trait">
                     <span class="trait-icon">🚀</span>
-                    <span>{traits.get('initiation_style', 'Initiator')}</span>
+                    <span>{_esc(traits.get('initiation_style', 'Initiator'))}</span>
                 </div>
             </div>
-            """
+            """)
         
-        section += "</div>"
-        return section
+        section.append("</div>")
+        return "".join(section)
     
     def _generate_behavioral_indicators(self, data: Dict) -> str:
         """Generate behavioral indicators section"""
@@ -729,90 +1189,45 @@ class WhatsAppReportGenerator:
         tone_analysis = data.get('tone_analysis', {})
         content_analysis = data.get('content_analysis', {})
         
-        # Build dynamic indicators list
+        # Build dynamic indicators list from the rule table
         indicators = []
         
-        # Tone indicators
-        casual_pct = tone_analysis.get('casual_percentage', 0)
-        if casual_pct > 20:
-            indicators.append(f"Very casual/slang language ({casual_pct:.1f}%) - typical of close friendships")
-        elif casual_pct > 10:
-            indicators.append(f"Moderate casual language ({casual_pct:.1f}%) - comfortable relationship")
-        
-        formal_pct = tone_analysis.get('formal_percentage', 0)
-        if formal_pct > 15:
-            indicators.append(f"Formal/polite language ({formal_pct:.1f}%) - professional or new relationship")
-        
-        insult_pct = tone_analysis.get('insult_percentage', 0)
-        roasting_pct = tone_analysis.get('roasting_percentage', 0)
-        if roasting_pct > 1 or insult_pct > 2:
-            indicators.append(f"Playful roasting/insults detected ({roasting_pct:.1f}%) - close friends who joke around")
-        
-        # Content indicators
-        shared_parent_pct = content_analysis.get('shared_parent_percentage', 0)
-        if shared_parent_pct > 2:
-            indicators.append(f"⭐ Frequent shared parent references ({shared_parent_pct:.1f}%) - STRONG sibling indicator!")
-        elif shared_parent_pct > 0.5:
-            indicators.append(f"Shared parent discussions ({shared_parent_pct:.1f}%) - possible siblings")
-        
-        future_life_pct = content_analysis.get('future_life_percentage', 0)
-        if future_life_pct > 1:
-            indicators.append(f"⭐ Life planning discussions ({future_life_pct:.1f}%) - serious romantic or family relationship")
-        elif future_life_pct > 0.3:
-            indicators.append(f"Future life discussions ({future_life_pct:.1f}%) - long-term relationship")
-        
-        future_living_pct = content_analysis.get('future_living_percentage', 0)
-        if future_living_pct > 0.5:
-            indicators.append(f"Living together discussions ({future_living_pct:.1f}%) - roommates or romantic partners")
-        
-        future_business_pct = content_analysis.get('future_business_percentage', 0)
-        if future_business_pct > 1:
-            indicators.append(f"Business planning ({future_business_pct:.1f}%) - work partners or entrepreneurs")
-        
-        future_travel_pct = content_analysis.get('future_travel_percentage', 0)
-        if future_travel_pct > 1:
-            indicators.append(f"Travel planning together ({future_travel_pct:.1f}%) - close relationship")
-        
-        # Additional behavioral indicators from data
-        greetings = data.get('total_greetings', 0)
-        if greetings > 10:
-            indicators.append(f"Regular good morning/night greetings ({greetings} times) - intimate behavior")
-        
-        affection = data.get('total_affection', 0)
-        if affection > 20:
-            indicators.append(f"Frequent affectionate language ({affection} times) - romantic or very close")
-        
-        night_pct = data.get('night_percentage', 0)
-        if night_pct > 20:
-            indicators.append(f"High late-night messaging ({night_pct:.1f}%) - close relationship")
+        sources = {'tone_analysis': tone_analysis, 'content_analysis': content_analysis, None: data}
+        for source_name, key, tiers, alternate in _INDICATOR_RULES:
+            source = sources[source_name]
+            value = source.get(key, 0)
+            for threshold, message in tiers:
+                if value > threshold or (alternate and source.get(alternate[0], 0) > alternate[1]):
+                    indicators.append(message.format(v=value))
+                    break
         
         # Fallback to romantic indicators if no other data
         if not indicators:
             indicators = data.get('romantic_indicators', ['Analysis based on communication patterns'])
         
-        section = f"""
+        section = [f"""
         <div class="section">
             <div class="section-title">🔍 Behavioral Indicators & Key Signals</div>
             <div class="emoji-large">{"✅" if len(indicators) >= 5 else "📊"}</div>
             
             <div class="indicator-list">
                 <h3 style="margin-bottom: 15px;">Detected Patterns ({len(indicators)} key indicators)</h3>
-        """
+        """]
         
         for i, indicator in enumerate(indicators, 1):
-            section += f"""
+            section.append(f"""
                 <div class="indicator-item">
                     <div class="indicator-number">{i}</div>
-                    <div>{indicator}</div>
+                    <div>{_esc(indicator)}</div>
                 </div>
-            """
+            """)
         
-        section += """
+        section.append("""
             </div>
         </div>
-        """
+        """)
         
-        return section
+        return "".join(section)
     
     def _generate_final_judgment(self, data: Dict) -> str:
         """Generate final judgment section"""
@@ -823,24 +1238,9 @@ class WhatsAppReportGenerator:
         relationship_type_map = data.get('relationship_type_map', {})
         
         if relationship_scores:
-            top_type = max(relationship_scores, key=relationship_scores.get)
-            top_score = relationship_scores[top_type]
+            top_type, top_score = _top_relationship(relationship_scores)
             top_label = relationship_type_map.get(top_type, top_type.replace('_', ' ').title())
-            emoji_map = {
-                'romantic_dating': '💕',
-                'romantic_established': '❤️',
-                'close_friends': '👥',
-                'casual_friends': '🤝',
-                'family_sibling': '👨‍👩‍👧‍👦',
-                'family_parent': '👨‍👩‍👧',
-                'colleagues': '💼',
-                'work_professional': '🏢',
-                'boss_subordinate': '👔',
-                'acquaintances': '👋',
-                'enemy_conflict': '⚔️',
-                'new_acquaintance': '✨'
-            }
-            top_emoji = emoji_map.get(top_type, '📊')
+            top_emoji = _EMOJI_MAP.get(top_type, '📊')
             indicator_text = f"{top_emoji} {top_label} Relationship (Confidence: {top_score})"
         else:
             # Fallback
@@ -854,11 +1254,11 @@ class WhatsAppReportGenerator:
             <div class="judgment-box" style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);">
                 <div class="judgment-title">Conclusion</div>
                 <div class="judgment-content">
-                    {conclusion}
+                    {_esc(conclusion)}
                 </div>
                 <div style="text-align: center; margin-top: 20px;">
                     <div class="score-badge" style="background: rgba(255,255,255,0.2); font-size: 1.1em;">
-                        {indicator_text}
+                        {_esc(indicator_text)}
                     </div>
                 </div>
             </div>
@@ -883,9 +1283,7 @@ class WhatsAppReportGenerator:
         content_analysis = data.get('content_analysis', {})
         
         # Determine top relationship type
-        top_type = None
-        if relationship_scores:
-            top_type = max(relationship_scores, key=relationship_scores.get)
+        top_type, _ = _top_relationship(relationship_scores)
         
         # Communication frequency
         msgs_per_day = data.get('msgs_per_day', 0)
@@ -939,14 +1337,14 @@ class WhatsAppReportGenerator:
         if not takeaways:
             takeaways.append("Balanced and healthy communication patterns detected")
         
-        html = ""
-        for takeaway in takeaways:
-            html += f'<li style="margin: 10px 0; padding-left: 25px; position: relative;"><span style="position: absolute; left: 0;">•</span>{takeaway}</li>'
-        
-        return html
+        return "".join([
+            f'<li style="margin: 10px 0; padding-left: 25px; position: relative;"><span style="position: absolute; left: 0;">•</span>{takeaway}</li>'
+            for takeaway in takeaways
+        ])
 
-    def _generate_compact_html(self, data: Dict[str, Any]) -> str:
+    def _generate_compact_html(self, data: Dict[str, Any], now: datetime = None) -> str:
         """Generate a compact, single-page card format HTML"""
+        now = now or datetime.now()
         
         # Get key data
         relationship_scores = data.get('relationship_scores', {})
@@ -954,308 +1352,52 @@ class WhatsAppReportGenerator:
         tone_analysis = data.get('tone_analysis', {})
         
         # Get top relationship type
-        top_type = max(relationship_scores, key=relationship_scores.get) if relationship_scores else 'unknown'
-        top_score = relationship_scores.get(top_type, 0)
+        top_type, top_score = _top_relationship(relationship_scores)
+        if top_type is None:
+            top_type, top_score = 'unknown', 0
         top_label = relationship_type_map.get(top_type, data.get('relationship_type', 'Unknown'))
         
-        emoji_map = {
-            'romantic_dating': '💕',
-            'romantic_established': '❤️',
-            'close_friends': '👥',
-            'casual_friends': '🤝',
-            'family_sibling': '👨‍👩‍👧‍👦',
-            'family_parent': '👨‍👩‍👧',
-            'colleagues': '💼',
-            'work_professional': '🏢',
-            'boss_subordinate': '👔',
-            'acquaintances': '👋',
-            'enemy_conflict': '⚔️',
-            'new_acquaintance': '✨'
-        }
-        top_emoji = emoji_map.get(top_type, '📊')
+        top_emoji = _EMOJI_MAP.get(top_type, '📊')
         
         participants = data.get('participants', [])
-        participant_display = ', '.join(participants) if len(participants) <= 4 else f"{len(participants)} people"
-        
-        return f"""<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>WhatsApp Relationship Card</title>
-    <style>
-        @media print {{
-            @page {{ 
-                size: A4; 
-                margin: 10mm; 
-            }}
-            
-            body {{ 
-                margin: 0; 
-                padding: 20px;
-                -webkit-print-color-adjust: exact !important;
-                print-color-adjust: exact !important;
-                color-adjust: exact !important;
-            }}
-            
-            /* Force all colors to print exactly as shown */
-            * {{
-                -webkit-print-color-adjust: exact !important;
-                print-color-adjust: exact !important;
-                color-adjust: exact !important;
-            }}
-            
-            /* Ensure headings are dark */
-            .relationship-type, .confidence, strong, h3 {{
-                color: #000000 !important;
-            }}
-            
-            /* Keep gradient backgrounds */
-            .stat-box, .card {{
-                -webkit-print-color-adjust: exact !important;
-                print-color-adjust: exact !important;
-            }}
-            
-            /* Ensure text contrast */
-            .stat-label, .stat-value {{
-                color: #ffffff !important;
-                text-shadow: 0 1px 2px rgba(0,0,0,0.3);
-            }}
-            
-            /* Keep insight text dark */
-            .insight-item {{
-                color: #000000 !important;
-            }}
-            
-            /* Progress bars */
-            .progress-bar {{
-                border: 1px solid #ddd !important;
-            }}
-            
-            .progress-fill {{
-                -webkit-print-color-adjust: exact !important;
-                print-color-adjust: exact !important;
-            }}
-        }}
-        
-        * {{
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }}
-        
-        body {{
-            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Arial, sans-serif;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            padding: 20px;
-            min-height: 100vh;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-        }}
-        
-        .card {{
-            background: white;
-            border-radius: 20px;
-            padding: 40px;
-            max-width: 800px;
-            width: 100%;
-            box-shadow: 0 20px 60px rgba(0,0,0,0.3);
-        }}
-        
-        .header {{
-            text-align: center;
-            margin-bottom: 30px;
-            padding-bottom: 20px;
-            border-bottom: 2px solid #f0f0f0;
-        }}
-        
-        .emoji-large {{
-            font-size: 60px;
-            margin-bottom: 10px;
-        }}
-        
-        .relationship-type {{
-            font-size: 28px;
-            font-weight: bold;
-            color: #667eea;
-            margin-bottom: 5px;
-        }}
-        
-        .confidence {{
-            font-size: 14px;
-            color: #666;
-            text-transform: uppercase;
-            letter-spacing: 1px;
-        }}
-        
-        .stats-grid {{
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(180px, 1fr));
-            gap: 15px;
-            margin: 25px 0;
-        }}
-        
-        .stat-box {{
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            padding: 20px;
-            border-radius: 12px;
-            color: white;
-            text-align: center;
-        }}
-        
-        .stat-value {{
-            font-size: 32px;
-            font-weight: bold;
-            display: block;
-            margin-bottom: 5px;
-        }}
-        
-        .stat-label {{
-            font-size: 12px;
-            opacity: 0.9;
-            text-transform: uppercase;
-            letter-spacing: 0.5px;
-        }}
-        
-        .insights {{
-            margin-top: 25px;
-        }}
-        
-        .insight-item {{
-            background: #f8f9fa;
-            padding: 12px 15px;
-            margin: 8px 0;
-            border-radius: 8px;
-            font-size: 14px;
-            display: flex;
-            align-items: center;
-            gap: 10px;
-        }}
-        
-        .insight-icon {{
-            font-size: 20px;
-        }}
-        
-        .scores-section {{
-            margin-top: 25px;
-            padding-top: 20px;
-            border-top: 2px solid #f0f0f0;
-        }}
-        
-        .score-bar {{
-            margin: 10px 0;
-        }}
-        
-        .score-label {{
-            font-size: 13px;
-            margin-bottom: 5px;
-            display: flex;
-            justify-content: space-between;
-        }}
-        
-        .progress-bar {{
-            height: 6px;
-            background: #e0e0e0;
-            border-radius: 3px;
-            overflow: hidden;
-        }}
-        
-        .progress-fill {{
-            height: 100%;
-            background: linear-gradient(90deg, #667eea 0%, #764ba2 100%);
-            transition: width 0.3s ease;
-        }}
-        
-        .footer {{
-            margin-top: 25px;
-            padding-top: 20px;
-            border-top: 2px solid #f0f0f0;
-            text-align: center;
-            font-size: 12px;
-            color: #999;
-        }}
-    </style>
-</head>
-<body>
-    <div class="card">
-        <div class="header">
-            <div class="emoji-large">{top_emoji}</div>
-            <div class="relationship-type">{top_label}</div>
-            <div class="confidence">Confidence: {data.get('confidence_level', 'MODERATE')} ({top_score})</div>
-            <div style="margin-top: 10px; font-size: 14px; color: #666;">{data.get('relationship_interpretation', '')}</div>
-        </div>
-        
-        <div class="stats-grid">
-            <div class="stat-box">
-                <span class="stat-value">{data.get('total_messages', 0):,}</span>
-                <span class="stat-label">Messages</span>
-            </div>
-            <div class="stat-box">
-                <span class="stat-value">{data.get('duration_days', 0)}</span>
-                <span class="stat-label">Days</span>
-            </div>
-            <div class="stat-box">
-                <span class="stat-value">{data.get('msgs_per_day', 0):.0f}</span>
-                <span class="stat-label">Msgs/Day</span>
-            </div>
-            <div class="stat-box">
-                <span class="stat-value">{len(participants)}</span>
-                <span class="stat-label">People</span>
-            </div>
-        </div>
-        
-        <div class="insights">
-            <strong style="font-size: 16px; display: block; margin-bottom: 10px;">📊 Key Insights</strong>
-            
-            <div class="insight-item">
-                <span class="insight-icon">🗣️</span>
-                <span>Casual: {tone_analysis.get('casual_percentage', 0):.1f}% | Formal: {tone_analysis.get('formal_percentage', 0):.1f}%</span>
-            </div>
-            
-            <div class="insight-item">
-                <span class="insight-icon">💬</span>
-                <span>{"Group chat" if len(participants) > 2 else "One-on-one"} conversation{" with " + participant_display if len(participants) <= 4 else ""}</span>
-            </div>
-            
-            {self._get_compact_key_insight(data)}
-        </div>
-        
-        <div class="scores-section">
-            <strong style="font-size: 16px; display: block; margin-bottom: 15px;">🎯 Relationship Scores</strong>
-            {self._generate_compact_scores(relationship_scores, relationship_type_map)}
-        </div>
-        
-        <div class="footer">
-            <p>WhatsApp Friendship Analyzer | Generated {datetime.now().strftime('%B %d, %Y')}</p>
-            <p style="margin-top: 5px;">Participants: {participant_display}</p>
-        </div>
-    </div>
-</body>
-</html>"""
+        participant_count = len(participants)
+        conversation_summary = f"{'Group chat' if participant_count > 2 else 'One-on-one'} conversation"
+        if participant_count <= 4:
+            participant_display = _esc(', '.join(participants))
+            conversation_summary += f" with {participant_display}"
+        else:
+            participant_display = f"{participant_count} people"
+        
+        return _CARD_SKELETON % {
+            'top_emoji': top_emoji,
+            'top_label': _esc(top_label),
+            'confidence': _esc(data.get('confidence_level', 'MODERATE')),
+            'top_score': top_score,
+            'interpretation': _esc(data.get('relationship_interpretation', '')),
+            'total_messages': f"{data.get('total_messages', 0):,}",
+            'duration_days': data.get('duration_days', 0),
+            'msgs_per_day': f"{data.get('msgs_per_day', 0):.0f}",
+            'participant_count': participant_count,
+            'casual_pct': f"{tone_analysis.get('casual_percentage', 0):.1f}",
+            'formal_pct': f"{tone_analysis.get('formal_percentage', 0):.1f}",
+            'conversation_summary': conversation_summary,
+            'key_insight': self._get_compact_key_insight(data),
+            'scores': self._generate_compact_scores(relationship_scores, relationship_type_map),
+            'generated_date': now.strftime('%B %d, %Y'),
+            'participant_display': participant_display,
+        }
 
     def _get_compact_key_insight(self, data: Dict) -> str:
         """Generate a single key insight for compact card"""
-        tone_analysis = data.get('tone_analysis', {})
-        content_analysis = data.get('content_analysis', {})
+        if len(data.get('participants', [])) > 2:
+            return _GROUP_INSIGHT
         
-        casual_pct = tone_analysis.get('casual_percentage', 0)
-        future_life_pct = content_analysis.get('future_life_percentage', 0)
-        shared_parent_pct = content_analysis.get('shared_parent_percentage', 0)
-        night_pct = data.get('night_percentage', 0)
+        for source_name, key, threshold, insight in _INSIGHT_RULES:
+            source = data.get(source_name, {}) if source_name else data
+            if source.get(key, 0) > threshold:
+                return insight
         
-        if len(data.get('participants', [])) > 2:
-            return '<div class="insight-item"><span class="insight-icon">👥</span><span>Active group dynamic with regular participation</span></div>'
-        elif shared_parent_pct > 2:
-            return '<div class="insight-item"><span class="insight-icon">⭐</span><span>Strong sibling indicators detected</span></div>'
-        elif future_life_pct > 1:
-            return '<div class="insight-item"><span class="insight-icon">🔮</span><span>Serious future planning discussions</span></div>'
-        elif casual_pct > 25:
-            return '<div class="insight-item"><span class="insight-icon">😎</span><span>Very casual and comfortable communication</span></div>'
-        elif night_pct > 20:
-            return '<div class="insight-item"><span class="insight-icon">🌙</span><span>Frequent late-night conversations</span></div>'
-        else:
-            return '<div class="insight-item"><span class="insight-icon">💭</span><span>Consistent and balanced communication</span></div>'
+        return _DEFAULT_INSIGHT
     
     def _generate_compact_scores(self, scores: Dict, type_map: Dict) -> str:
         """Generate compact score bars for top 3 relationships"""
@@ -1263,23 +1405,18 @@ class WhatsAppReportGenerator:
             return ""
         
         sorted_scores = sorted(scores.items(), key=lambda x: x[1], reverse=True)[:3]
-        max_score = max(scores.values()) if scores else 100
+        # Highest score is already first after sorting
+        max_score = sorted_scores[0][1]
+        
+        scale = 100 / max_score if max_score > 0 else 0
         
-        html = ""
+        bars = []
         for rel_type, score in sorted_scores:
             label = type_map.get(rel_type, rel_type.replace('_', ' ').title())
-            percentage = (score / max_score * 100) if max_score > 0 else 0
-            
-            html += f"""
-            <div class="score-bar">
-                <div class="score-label">
-                    <span>{label}</span>
-                    <span>{score}</span>
-                </div>
-                <div class="progress-bar">
-                    <div class="progress-fill" style="width: {percentage}%"></div>
-                </div>
-            </div>
-            """
+            bars.append(_SCORE_BAR % {
+                'label': _esc(label),
+                'score': score,
+                'percentage': score * scale,
+            })
         
-        return html
+        return "".join(bars)
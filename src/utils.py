@@ -5,11 +5,47 @@ Utility functions for the WhatsApp Friendship Analyzer
 import re
 import json
 import hashlib
+import shutil
+import time
+from functools import lru_cache
+from itertools import islice
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Iterable, Iterator
 from pathlib import Path
+import numpy as np
 import pandas as pd
 
+# Optional: orjson for faster JSON decoding
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Optional: ijson for streaming large JSON arrays
+try:
+    import ijson
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
+
+# Precompiled patterns used by the text helpers below
+_WS_RE = re.compile(r'\s+')
+_MEDIA_RE = re.compile(r'<Media omitted>')
+_ATTACH_RE = re.compile(r'<attached: .*?>')
+_EMOJI_RE = re.compile(
+    "["
+    "\U0001F600-\U0001F64F"  # emoticons
+    "\U0001F300-\U0001F5FF"  # symbols & pictographs
+    "\U0001F680-\U0001F6FF"  # transport & map symbols
+    "\U0001F1E0-\U0001F1FF"  # flags (iOS)
+    "\U00002702-\U000027B0"
+    "\U000024C2-\U0001F251"
+    "]+",
+    flags=re.UNICODE
+)
+
+@lru_cache(maxsize=4096)
 def anonymize_name(name: str, salt: str = "default_salt") -> str:
     """
     Anonymize a name using hashing
@@ -21,8 +57,9 @@ def anonymize_name(name: str, salt: str = "default_salt") -> str:
     Returns:
         Anonymized name
     """
-    hash_object = hashlib.sha256((name + salt).encode())
-    return f"Person_{hash_object.hexdigest()[:8]}"
+    # A 4-byte BLAKE2b digest yields the 8 hex characters directly
+    hash_object = hashlib.blake2b((name + salt).encode(), digest_size=4)
+    return f"Person_{hash_object.hexdigest()}"
 
 def normalize_text(text: str) -> str:
     """
@@ -35,14 +72,33 @@ def normalize_text(text: str) -> str:
         Normalized text
     """
     # Remove extra whitespace
-    text = re.sub(r'\s+', ' ', text.strip())
+    text = _WS_RE.sub(' ', text.strip())
     
     # Remove media indicators
-    text = re.sub(r'<Media omitted>', '', text)
-    text = re.sub(r'<attached: .*?>', '', text)
+    text = _MEDIA_RE.sub('', text)
+    text = _ATTACH_RE.sub('', text)
     
     return text
 
+def normalize_text_series(texts: pd.Series) -> pd.Series:
+    """
+    Normalize a whole column of message text at once
+    
+    Vectorized equivalent of normalize_text using pandas string methods.
+    
+    Args:
+        texts: Series of message strings
+        
+    Returns:
+        Series of normalized text
+    """
+    return (
+        texts.str.strip()
+        .str.replace(_WS_RE, ' ', regex=True)
+        .str.replace(_MEDIA_RE, '', regex=True)
+        .str.replace(_ATTACH_RE, '', regex=True)
+    )
+
 def extract_emojis(text: str) -> List[str]:
     """
     Extract emojis from text
@@ -53,18 +109,10 @@ def extract_emojis(text: str) -> List[str]:
     Returns:
         List of emojis
     """
-    emoji_pattern = re.compile(
-        "["
-        "\U0001F600-\U0001F64F"  # emoticons
-        "\U0001F300-\U0001F5FF"  # symbols & pictographs
-        "\U0001F680-\U0001F6FF"  # transport & map symbols
-        "\U0001F1E0-\U0001F1FF"  # flags (iOS)
-        "\U00002702-\U000027B0"
-        "\U000024C2-\U0001F251"
-        "]+",
-        flags=re.UNICODE
-    )
-    return emoji_pattern.findall(text)
+    # Every emoji range lies outside ASCII, so plain-ASCII text can skip the regex
+    if text.isascii():
+        return []
+    return _EMOJI_RE.findall(text)
 
 def time_difference_minutes(time1: datetime, time2: datetime) -> float:
     """
@@ -79,6 +127,22 @@ def time_difference_minutes(time1: datetime, time2: datetime) -> float:
     """
     return abs((time2 - time1).total_seconds() / 60)
 
+def time_difference_minutes_array(timestamps: Any) -> np.ndarray:
+    """
+    Calculate gaps in minutes between consecutive timestamps
+    
+    Vectorized equivalent of calling time_difference_minutes on each
+    neighboring pair, e.g. over a message timestamp column.
+    
+    Args:
+        timestamps: Sequence, array or Series of timestamps in order
+        
+    Returns:
+        Array of len(timestamps) - 1 absolute differences in minutes
+    """
+    nanoseconds = np.asarray(timestamps, dtype='datetime64[ns]').view('i8')
+    return np.abs(np.diff(nanoseconds)) / 6e10
+
 def format_duration(minutes: float) -> str:
     """
     Format duration in human-readable format
@@ -89,16 +153,29 @@ def format_duration(minutes: float) -> str:
     Returns:
         Formatted duration string
     """
-    if minutes < 60:
-        return f"{int(minutes)} minutes"
-    elif minutes < 1440:  # 24 hours
-        hours = int(minutes / 60)
-        remaining_minutes = int(minutes % 60)
+    total_minutes = int(minutes)
+    if total_minutes < 60:
+        return f"{total_minutes} minutes"
+    
+    hours, remaining_minutes = divmod(total_minutes, 60)
+    if hours < 24:
         return f"{hours}h {remaining_minutes}m"
-    else:
-        days = int(minutes / 1440)
-        remaining_hours = int((minutes % 1440) / 60)
-        return f"{days}d {remaining_hours}h"
+    
+    days, remaining_hours = divmod(hours, 24)
+    return f"{days}d {remaining_hours}h"
+
+def _read_json(file_path: Path) -> Any:
+    """Parse a JSON file, using orjson when it is installed"""
+    if ORJSON_AVAILABLE:
+        with open(file_path, 'rb') as f:
+            raw = f.read()
+        try:
+            return orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            # orjson rejects the NaN/Infinity tokens json.dump writes by default
+            return json.loads(raw.decode('utf-8'))
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
 
 def safe_json_load(file_path: Path) -> Optional[Dict]:
     """
@@ -111,26 +188,30 @@ def safe_json_load(file_path: Path) -> Optional[Dict]:
         Loaded JSON data or None if failed
     """
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return _read_json(file_path)
     except (FileNotFoundError, json.JSONDecodeError, UnicodeDecodeError):
         return None
 
-def safe_json_save(data: Dict, file_path: Path) -> bool:
+def safe_json_save(data: Dict, file_path: Path, indent: bool = True) -> bool:
     """
     Safely save data to JSON file
     
     Args:
         data: Data to save
         file_path: Path to save file
+        indent: Pretty-print with two-space indentation; pass False for
+            compact output when the file is only read back by code
         
     Returns:
         True if successful, False otherwise
     """
     try:
         file_path.parent.mkdir(parents=True, exist_ok=True)
+        # Saving stays on json: orjson writes NaN as null, numpy scalars as
+        # numbers instead of default=str strings and floats in another format
+        layout = {'indent': 2} if indent else {'separators': (',', ':')}
         with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False, default=str)
+            json.dump(data, f, ensure_ascii=False, default=str, **layout)
         return True
     except Exception:
         return False
@@ -161,12 +242,28 @@ def create_backup(file_path: Path) -> Path:
         Path to backup file
     """
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    backup_path = file_path.parent / f"{file_path.stem}_backup_{timestamp}{file_path.suffix}"
+    backup_stem = f"{file_path.stem}_backup_{timestamp}"
+    backup_path = file_path.with_name(f"{backup_stem}{file_path.suffix}")
     
-    if file_path.exists():
-        import shutil
-        shutil.copy2(file_path, backup_path)
+    # Several backups within the same second get an increasing counter
+    # instead of overwriting each other
+    counter = 1
+    while backup_path.exists():
+        backup_path = file_path.with_name(f"{backup_stem}_{counter}{file_path.suffix}")
+        counter += 1
+    
+    try:
+        size = file_path.stat().st_size
+    except FileNotFoundError:
+        return backup_path
     
+    # copy2 already copies in the kernel on Linux and falls back itself
+    # where that is unsupported
+    shutil.copy2(file_path, backup_path)
+    
+    copied = backup_path.stat().st_size
+    if copied != size:
+        raise OSError(f"Backup of {file_path} is incomplete: copied {copied} of {size} bytes")
     return backup_path
 
 def validate_date_range(start_date: datetime, end_date: datetime) -> bool:
@@ -195,6 +292,24 @@ def chunk_list(lst: List[Any], chunk_size: int) -> List[List[Any]]:
     """
     return [lst[i:i + chunk_size] for i in range(0, len(lst), chunk_size)]
 
+def iter_chunks(items: Iterable[Any], chunk_size: int) -> Iterator[List[Any]]:
+    """
+    Lazily split any iterable into chunks
+    
+    Args:
+        items: Iterable to chunk
+        chunk_size: Size of each chunk
+        
+    Yields:
+        Lists of up to chunk_size items
+    """
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, chunk_size))
+        if not batch:
+            return
+        yield batch
+
 def calculate_percentile(values: List[float], percentile: float) -> float:
     """
     Calculate percentile of values
@@ -209,16 +324,36 @@ def calculate_percentile(values: List[float], percentile: float) -> float:
     if not values:
         return 0.0
     
-    sorted_values = sorted(values)
-    index = (percentile / 100) * (len(sorted_values) - 1)
+    return float(np.percentile(np.asarray(values, dtype=np.float64), percentile))
+
+def calculate_percentiles(values: List[float], percentiles: List[float]) -> List[float]:
+    """
+    Calculate several percentiles of values in one pass
     
-    if index.is_integer():
-        return sorted_values[int(index)]
-    else:
-        lower_index = int(index)
-        upper_index = lower_index + 1
-        weight = index - lower_index
-        return sorted_values[lower_index] * (1 - weight) + sorted_values[upper_index] * weight
+    Args:
+        values: List of values
+        percentiles: Percentiles to calculate (each 0-100)
+        
+    Returns:
+        Percentile values, in the same order as percentiles
+    """
+    if not values:
+        return [0.0] * len(percentiles)
+    
+    return np.percentile(np.asarray(values, dtype=np.float64), percentiles).tolist()
+
+@lru_cache(maxsize=128)
+def _detect_encoding(file_path: Path, mtime: float, size: int) -> str:
+    """Sniff the encoding of one version of a file, keyed on its mtime and size"""
+    try:
+        from cchardet import detect
+    except ImportError:
+        from charset_normalizer import detect
+    
+    with open(file_path, 'rb') as f:
+        raw_data = f.read(10000)  # Read first 10KB
+        result = detect(raw_data)
+        return result.get('encoding') or 'utf-8'
 
 def detect_file_encoding(file_path: Path) -> str:
     """
@@ -230,13 +365,9 @@ def detect_file_encoding(file_path: Path) -> str:
     Returns:
         Detected encoding
     """
-    import chardet
-    
     try:
-        with open(file_path, 'rb') as f:
-            raw_data = f.read(10000)  # Read first 10KB
-            result = chardet.detect(raw_data)
-            return result.get('encoding', 'utf-8')
+        stat = file_path.stat()
+        return _detect_encoding(file_path, stat.st_mtime, stat.st_size)
     except Exception:
         return 'utf-8'
 
@@ -247,27 +378,47 @@ class ProgressTracker:
         self.total = total
         self.current = 0
         self.description = description
-        self.start_time = datetime.now()
+        self.start_time = time.monotonic()
+        # Print every 5%; the stride is fixed, so update() only compares
+        self._stride = max(1, total // 20)
+        self._next_print = self._stride
     
     def update(self, increment: int = 1):
         """Update progress"""
         self.current += increment
-        if self.current % max(1, self.total // 20) == 0:  # Update every 5%
+        if self.current >= self._next_print:
             self.print_progress()
+            while self._next_print <= self.current:
+                self._next_print += self._stride
+    
+    def _elapsed(self) -> timedelta:
+        """Time since the tracker was created"""
+        return timedelta(seconds=time.monotonic() - self.start_time)
     
     def print_progress(self):
         """Print progress"""
         if self.total > 0:
             percentage = (self.current / self.total) * 100
-            elapsed = datetime.now() - self.start_time
+            elapsed = self._elapsed()
             print(f"{self.description}: {self.current}/{self.total} ({percentage:.1f}%) - Elapsed: {elapsed}")
     
     def finish(self):
         """Mark as finished"""
         self.current = self.total
-        elapsed = datetime.now() - self.start_time
+        elapsed = self._elapsed()
         print(f"{self.description}: Complete! Total time: {elapsed}")
 
+def _has_array_root(file_path: Path) -> bool:
+    """Check whether a JSON file's top-level value is an array"""
+    with open(file_path, 'rb') as f:
+        while True:
+            block = f.read(1024)
+            if not block:
+                return False
+            stripped = block.lstrip()
+            if stripped:
+                return stripped.startswith(b'[')
+
 def memory_efficient_json_reader(file_path: Path, chunk_size: int = 1000):
     """
     Read large JSON files in chunks
@@ -280,14 +431,27 @@ def memory_efficient_json_reader(file_path: Path, chunk_size: int = 1000):
         Chunks of JSON data
     """
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            
-            if isinstance(data, list):
-                for i in range(0, len(data), chunk_size):
-                    yield data[i:i + chunk_size]
-            else:
-                yield data
+        streamed = 0
+        if IJSON_AVAILABLE and _has_array_root(file_path):
+            # Stream top-level array items so only one chunk is held in memory
+            try:
+                with open(file_path, 'rb') as f:
+                    for chunk in iter_chunks(ijson.items(f, 'item', use_float=True), chunk_size):
+                        yield chunk
+                        streamed += len(chunk)
+                return
+            except ijson.JSONError:
+                # ijson rejects the NaN/Infinity tokens json.dump writes by
+                # default; finish with a full load from where streaming stopped
+                pass
+        
+        data = _read_json(file_path)
+        
+        if isinstance(data, list):
+            for i in range(streamed, len(data), chunk_size):
+                yield data[i:i + chunk_size]
+        else:
+            yield data
     except Exception as e:
         print(f"Error reading JSON file: {e}")
         yield []
\ No newline at end of file